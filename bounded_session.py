@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# bounded session - 오래 쓰는 session 의 identity map 크기 제한과 사용량 확인
+#
+#  1.x 스크립트처럼 session 하나로 전체 작업을 하면, query(User) 로 읽은 객체가
+#  session.close() 까지 identity map 에 남는다 (relationship 으로 서로 참조하는 객체 등)
+#  BoundedSession: max_objects 개 또는 max_bytes(추정치) 를 넘으면 오래된 객체부터 expunge
+#  #  대상: 변경이 없고(new/dirty/deleted 아님) session 밖에서 참조하지 않는 객체
+#  #  #  session 안의 다른 객체(relationship)가 참조하는 것은 외부 참조로 보지 않음
+#  #  #  expunge cascade 로 같이 분리되는 객체도 모두 조건을 만족해야 함
+#  #  low_water 비율까지 줄임 (한도 근처에서 매번 정리하지 않도록)
+#  #  검사 시점: query 실행 전(do_orm_execute), flush 후, commit 후, trim() 호출
+#  #  #  query 하나의 결과는 한도를 넘어 로드될 수 있음
+#  stats(): 객체 수, mapper 별 객체 수, 추정 메모리, expunge 수
+#
+#  사용법)
+#  #  Session = sessionmaker(bind=engine, class_=BoundedSession, max_objects=10000)
+#  #  session = Session()
+#  #  for instance in session.query(User):
+#  #      ...
+#  #  print(session.stats())
+
+import sys
+from collections import Counter, OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, attributes
+
+
+# 객체 하나의 메모리 추정치 (객체, __dict__, 컬럼 값, InstanceState)
+def _estimate_bytes(state):
+    obj = state.obj()
+    if obj is None:
+        return 0
+    size = sys.getsizeof(obj) + sys.getsizeof(state) + sys.getsizeof(state.dict)
+    for prop in state.mapper.column_attrs:
+        value = state.dict.get(prop.key)
+        if value is not None:
+            size += sys.getsizeof(value)
+    return size
+
+
+def _related(state, prop):
+    value = state.dict.get(prop.key)
+    if value is None:
+        return ()
+    return value if prop.uselist else (value,)
+
+
+# 참조하는 쪽 속성을 expire 해도 되는지 (속성에 flush 되지 않은 변경이 없어야 함)
+def _releasable(holder, key, pending):
+    obj = holder.obj()
+    if obj is None or holder in pending:
+        return False
+    return not attributes.get_history(obj, key, attributes.PASSIVE_NO_INITIALIZE).has_changes()
+
+
+# 속성 값이 참조하던 객체의 내부 참조 횟수 차감
+def _release(state, key, refs):
+    prop = state.mapper.relationships[key]
+    for item in _related(state, prop):
+        refs[id(item)] -= 1
+
+
+class BoundedSession(Session):
+
+    def __init__(self, *args, max_objects=None, max_bytes=None, low_water=0.8, **kw):
+        super().__init__(*args, **kw)
+        self.max_objects = max_objects
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.evictions = 0
+        self.trims = 0
+        self.peak_objects = 0
+        # InstanceState => 추정 bytes (로드된 순서)
+        self._tracked = OrderedDict()
+        self._tracked_bytes = 0
+
+        for name in ("loaded_as_persistent", "pending_to_persistent",
+                     "detached_to_persistent", "deleted_to_persistent"):
+            event.listen(self, name, self._track)
+        for name in ("persistent_to_detached", "persistent_to_deleted",
+                     "persistent_to_transient"):
+            event.listen(self, name, self._untrack)
+        event.listen(self, "do_orm_execute", self._check)
+        event.listen(self, "after_flush_postexec", self._check)
+        event.listen(self, "after_commit", self._check)
+
+    def _track(self, session, instance):
+        state = self._state(instance)
+        if state in self._tracked:
+            return
+        size = self._tracked[state] = _estimate_bytes(state)
+        self._tracked_bytes += size
+        self.peak_objects = max(self.peak_objects, len(self._tracked))
+
+    def _untrack(self, session, instance):
+        self._forget(self._state(instance))
+
+    @staticmethod
+    def _state(instance):
+        return instance._sa_instance_state
+
+    def _forget(self, state):
+        size = self._tracked.pop(state, None)
+        if size is not None:
+            self._tracked_bytes -= size
+
+    # gc 로 사라졌거나 identity map 에 없는 객체 정리
+    def _purge(self):
+        for state in [state for state in self._tracked
+                      if state.obj() is None or state.key not in self.identity_map]:
+            self._forget(state)
+
+    def _over(self, factor=1.0):
+        if self.max_objects is not None and len(self._tracked) > self.max_objects * factor:
+            return True
+        return self.max_bytes is not None and self._tracked_bytes > self.max_bytes * factor
+
+    def _check(self, *args):
+        if self._over():
+            self.trim()
+
+    # session 안의 객체들이 relationship 으로 참조하는 횟수와 참조하는 (state, 속성)
+    def _internal_refs(self):
+        refs = Counter()
+        referrers = {}
+        for state in self.identity_map.all_states():
+            for prop in state.mapper.relationships:
+                for item in _related(state, prop):
+                    refs[id(item)] += 1
+                    referrers.setdefault(id(item), []).append((state, prop.key))
+        return refs, referrers
+
+    def _evictable(self, state, refs, pending):
+        obj = state.obj()
+        if obj is None or state.modified or state in pending:
+            return False
+        # getrefcount 인자 + 지역 변수 obj 를 제외한 참조가 모두 session 내부 참조인지
+        return sys.getrefcount(obj) - 2 <= refs[id(obj)]
+
+    # low_water 까지(max_objects/max_bytes 를 주지 않았으면 가능한 만큼) 오래된 객체부터 expunge
+    #  #  expunge 만으로는 session 에 남은 객체의 collection 등이 계속 참조하므로
+    #  #  참조하는 relationship 속성을 expire 해서(다음 접근 때 다시 로드) 메모리에서 해제되게 함
+    def trim(self, limit=None):
+        self._purge()
+        self.trims += 1
+        refs, referrers = self._internal_refs()
+        pending = {self._state(obj) for obj in list(self.new) + list(self.deleted)}
+        bounded = self.max_objects is not None or self.max_bytes is not None
+        factor = self.low_water if limit is None else limit
+        evicted = 0
+
+        for state in list(self._tracked):
+            if bounded and not self._over(factor):
+                break
+            if state not in self._tracked or not self._evictable(state, refs, pending):
+                continue
+            group = [state] + [sub_state for _, _, sub_state, _ in
+                               state.mapper.cascade_iterator("expunge", state)]
+            if not all(self._evictable(sub_state, refs, pending) for sub_state in group):
+                continue
+            members = set(group)
+            holders = {(holder, key) for sub_state in group
+                       for holder, key in referrers.get(id(sub_state.obj()), ())
+                       if holder not in members}
+            if not all(_releasable(holder, key, pending) for holder, key in holders):
+                continue
+
+            # expire 하는 동안 해제되지 않도록 잡아둠
+            obj = state.obj()
+            for holder, key in holders:
+                _release(holder, key, refs)
+                self.expire(holder.obj(), [key])
+            for sub_state in group:
+                for prop in sub_state.mapper.relationships:
+                    _release(sub_state, prop.key, refs)
+            self.expunge(obj)
+            del obj
+            evicted += len(group)
+
+        self.evictions += evicted
+        return evicted
+
+    def stats(self):
+        self._purge()
+        by_mapper = Counter(state.mapper.class_.__name__ for state in self.identity_map.all_states())
+        return {
+            "objects": len(self.identity_map),
+            "tracked": len(self._tracked),
+            "bytes": self._tracked_bytes,
+            "by_mapper": dict(by_mapper),
+            "new": len(self.new),
+            "dirty": len(self.dirty),
+            "evictions": self.evictions,
+            "trims": self.trims,
+            "peak_objects": self.peak_objects,
+            "max_objects": self.max_objects,
+            "max_bytes": self.max_bytes,
+        }
+
+    def close(self):
+        super().close()
+        self._tracked.clear()
+        self._tracked_bytes = 0
+
+
+# 예제: 1.x 스크립트처럼 session 하나로 작업 대상 User 를 잡아두고 addresses 를 차례로 읽기
+#  #  session 밖에서 참조하는 users 는 남고, collection 으로만 참조되는 Address 는 정리됨
+def main(users=5000):
+    from sqlalchemy import create_engine, insert
+    from sqlalchemy.orm import Session as PlainSession
+    from sqlalchemy.orm import sessionmaker
+
+    from tutorial_models import Address, Base, User
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": i, "name": f"user{i}", "fullname": ""}
+                                    for i in range(users)])
+        conn.execute(insert(Address), [{"email_address": f"user{i}-{n}@sqlalchemy.org",
+                                        "user_id": i} for i in range(users) for n in range(2)])
+
+    # expire_on_commit=False: commit 후에도 읽은 collection 이 그대로 남음
+    bounded = sessionmaker(bind=engine, class_=BoundedSession, expire_on_commit=False,
+                           max_objects=users + 1000)
+    for name, session in (("plain", PlainSession(engine, expire_on_commit=False)),
+                          ("bounded", bounded())):
+        work = session.query(User).order_by(User.id).all()
+        for i, user in enumerate(work):
+            user.addresses[0].email_address
+            if i % 100 == 99:
+                user.fullname = f"User {i}"
+                session.commit()
+        by_mapper = Counter(type(obj).__name__ for obj in session.identity_map.values())
+        print(name, len(session.identity_map), dict(by_mapper),
+              work[0].addresses[0].email_address)
+        if isinstance(session, BoundedSession):
+            print(session.stats())
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
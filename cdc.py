@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# CDC(change data capture) - commit 된 변경을 이벤트로 내보내기
+#
+#  1.x 스크립트 8) 단계처럼 session 은 commit 시점에 new/dirty/deleted 를 알고 있다
+#  flush 된 변경을 모아두었다가 transaction 이 commit 된 후에만 이벤트로 전달
+#  #  ChangeEvent: table, pk, op(INSERT/UPDATE/DELETE), changed(변경 컬럼), source(orm/core)
+#  #  session: after_flush 에서 수집 => after_commit 에서 전달, rollback 이면 버림
+#  #  Core DML(conn.execute(insert/update/delete)): after_execute 에서 수집
+#  #  #  connection 의 commit 이후(다음 begin 또는 pool 반환 시점)에 전달
+#  #  #  Core UPDATE/DELETE 는 pk 를 알 수 없으므로 pk=None (rowcount 만 기록)
+#  #  #  executemany INSERT 도 DB 가 pk 를 돌려주지 않으면 pk 값이 None
+#  #  savepoint rollback 된 변경은 제외
+#  전달: in-process queue => background thread 가 배치로 sink 호출
+#  #  sink: batch(list of ChangeEvent) 를 받는 callable (FileSink: JSON lines 파일)
+#  #  queue 가 가득 차면 overflow="block" 은 대기(back-pressure), "drop" 은 버리고 dropped 증가
+#
+#  사용법)
+#  #  stream = ChangeStream([FileSink("changes.log"), invalidate_cache])
+#  #  stream.watch_session(Session)      # Session 클래스, sessionmaker 또는 session
+#  #  stream.watch_engine(engine)        # Core DML 도 수집
+#  #  ...
+#  #  stream.close()
+
+import json
+import queue
+import threading
+import time
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import attributes
+
+_STOP = object()
+
+
+class ChangeEvent:
+
+    __slots__ = ("table", "pk", "op", "changed", "source", "rowcount")
+
+    def __init__(self, table, pk, op, changed=(), source="orm", rowcount=1):
+        self.table = table
+        self.pk = pk
+        self.op = op
+        self.changed = tuple(changed)
+        self.source = source
+        self.rowcount = rowcount
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __repr__(self):
+        return (f"ChangeEvent({self.op} {self.table} pk={self.pk!r} "
+                f"changed={list(self.changed)} source={self.source})")
+
+
+# JSON lines 파일 sink (배치마다 한번 write/flush)
+class FileSink:
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __call__(self, batch):
+        self._file.write("".join(json.dumps(change.as_dict(), default=str) + "\n"
+                                 for change in batch))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+# flush 된 객체 => ChangeEvent
+def _orm_changes(session):
+    changes = []
+    for obj in session.new:
+        mapper = inspect(obj).mapper
+        changed = [prop.key for prop in mapper.column_attrs
+                   if getattr(obj, prop.key, None) is not None]
+        changes.append(ChangeEvent(mapper.local_table.name,
+                                   tuple(mapper.primary_key_from_instance(obj)),
+                                   "INSERT", changed))
+    for obj in session.dirty:
+        mapper = inspect(obj).mapper
+        changed = [prop.key for prop in mapper.column_attrs
+                   if attributes.get_history(obj, prop.key,
+                                             attributes.PASSIVE_NO_INITIALIZE).has_changes()]
+        if changed:
+            changes.append(ChangeEvent(mapper.local_table.name,
+                                       tuple(mapper.primary_key_from_instance(obj)),
+                                       "UPDATE", changed))
+    for obj in session.deleted:
+        state = inspect(obj)
+        changes.append(ChangeEvent(state.mapper.local_table.name, state.identity, "DELETE"))
+    return changes
+
+
+# Core DML 실행 결과 => ChangeEvent
+def _core_changes(statement, result):
+    table = statement.table.name
+    compiled = result.context.compiled_parameters or [{}]
+    changed = [col.key for col in statement.table.columns if col.key in compiled[0]]
+
+    if statement.is_insert:
+        try:
+            pks = [tuple(row) for row in result.inserted_primary_key_rows]
+        except Exception:
+            pks = [None] * len(compiled)
+        return [ChangeEvent(table, pk, "INSERT", changed, "core") for pk in pks]
+
+    op = "UPDATE" if statement.is_update else "DELETE"
+    return [ChangeEvent(table, None, op, changed if op == "UPDATE" else (), "core",
+                        rowcount=result.rowcount)]
+
+
+# owner 가 transaction 자신이거나 그 안의 savepoint 인지
+def _within(owner, transaction):
+    while owner is not None:
+        if owner is transaction:
+            return True
+        owner = owner.parent
+    return False
+
+
+class ChangeStream:
+
+    def __init__(self, sinks=(), maxsize=10000, batch_size=500, max_delay=0.1,
+                 overflow="block"):
+        if overflow not in ("block", "drop"):
+            raise ValueError(f"알 수 없는 overflow 정책: {overflow!r} (block, drop)")
+        self.sinks = list(sinks)
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.overflow = overflow
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._local = threading.local()
+        self._thread = threading.Thread(target=self._run, name="cdc", daemon=True)
+        self._thread.start()
+
+    # commit 된 변경을 queue 에 넣음 (commit 한 thread 에서 호출)
+    def publish(self, changes):
+        for change in changes:
+            if self.overflow == "drop":
+                try:
+                    self._queue.put_nowait(change)
+                except queue.Full:
+                    self.dropped += 1
+            else:
+                self._queue.put(change)
+
+    def close(self, timeout=None):
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._deliver(batch)
+
+    def _deliver(self, batch):
+        for sink in self.sinks:
+            try:
+                sink(batch)
+            except Exception:
+                self.errors += 1
+        self.delivered += len(batch)
+
+    # ORM session 수집
+    #  #  변경은 session.info 에 transaction(savepoint) 단위로 보관
+    def watch_session(self, target):
+        event.listen(target, "before_flush", self._before_flush)
+        event.listen(target, "after_flush", self._after_flush)
+        event.listen(target, "after_flush_postexec", self._after_flush_postexec)
+        event.listen(target, "after_soft_rollback", self._after_soft_rollback)
+        event.listen(target, "after_commit", self._after_commit)
+        event.listen(target, "after_rollback", self._after_rollback)
+        return self
+
+    def _session_buffer(self, session):
+        return session.info.setdefault("cdc_changes", [])
+
+    def _before_flush(self, session, flush_context, instances):
+        self._local.in_flush = True
+
+    def _after_flush(self, session, flush_context):
+        transaction = session.get_nested_transaction() or session.get_transaction()
+        self._session_buffer(session).extend(
+            (transaction, change) for change in _orm_changes(session))
+
+    def _after_flush_postexec(self, session, flush_context):
+        self._local.in_flush = False
+
+    # savepoint rollback: 해당 savepoint(와 그 안에서 닫힌 savepoint)의 변경만 버림
+    def _after_soft_rollback(self, session, previous_transaction):
+        # flush 가 실패하면 after_flush_postexec 가 호출되지 않음
+        self._local.in_flush = False
+        if previous_transaction.nested:
+            buffer = self._session_buffer(session)
+            buffer[:] = [(owner, change) for owner, change in buffer
+                         if not _within(owner, previous_transaction)]
+
+    # savepoint 의 commit/rollback 에서도 호출되므로 가장 바깥 transaction 에서만 전달/폐기
+    #  #  savepoint commit: 변경을 상위 transaction 소속으로 옮김
+    #  #  savepoint rollback 은 _after_soft_rollback 에서만 처리
+    def _after_commit(self, session):
+        if session.in_nested_transaction():
+            transaction = session.get_nested_transaction()
+            buffer = self._session_buffer(session)
+            buffer[:] = [(transaction.parent if owner is transaction else owner, change)
+                         for owner, change in buffer]
+            return
+        buffer = session.info.pop("cdc_changes", None)
+        if buffer:
+            self.publish(change for _, change in buffer)
+
+    def _after_rollback(self, session):
+        self._local.in_flush = False
+        if session.in_nested_transaction():
+            return
+        session.info.pop("cdc_changes", None)
+
+    # Core DML 수집 (ORM flush 중 실행된 문장은 session 쪽에서 수집하므로 제외)
+    def watch_engine(self, engine):
+        event.listen(engine, "after_execute", self._after_execute)
+        event.listen(engine, "commit", self._commit)
+        event.listen(engine, "rollback", self._rollback)
+        event.listen(engine, "savepoint", self._savepoint)
+        event.listen(engine, "rollback_savepoint", self._rollback_savepoint)
+        event.listen(engine, "handle_error", self._handle_error)
+        event.listen(engine, "begin", self._begin)
+        event.listen(engine, "checkin", self._checkin)
+        return self
+
+    def _after_execute(self, conn, clauseelement, multiparams, params, execution_options,
+                       result):
+        if getattr(self._local, "in_flush", False) or not getattr(clauseelement, "is_dml", False):
+            return
+        conn.info.setdefault("cdc_pending", []).extend(_core_changes(clauseelement, result))
+
+    def _savepoint(self, conn, name):
+        conn.info.setdefault("cdc_savepoints", []).append(
+            (name, len(conn.info.get("cdc_pending", []))))
+
+    def _rollback_savepoint(self, conn, name, context):
+        marks = conn.info.get("cdc_savepoints", [])
+        while marks:
+            mark_name, size = marks.pop()
+            if mark_name == name:
+                del conn.info.get("cdc_pending", [])[size:]
+                break
+
+    # commit 직전 이벤트: 아직 전달하지 않고 staged 로 옮김
+    def _commit(self, conn):
+        conn.info.pop("cdc_savepoints", None)
+        pending = conn.info.pop("cdc_pending", None)
+        if pending:
+            conn.info.setdefault("cdc_staged", []).extend(pending)
+
+    def _rollback(self, conn):
+        conn.info.pop("cdc_savepoints", None)
+        conn.info.pop("cdc_pending", None)
+
+    # COMMIT 이 실패하면 staged 변경은 버림
+    def _handle_error(self, context):
+        if context.connection is not None and context.statement is None:
+            context.connection.info.pop("cdc_staged", None)
+
+    # commit 이 끝난 뒤 같은 connection 의 다음 begin, 또는 pool 반환 시점에 전달
+    def _begin(self, conn):
+        staged = conn.info.pop("cdc_staged", None)
+        if staged:
+            self.publish(staged)
+
+    def _checkin(self, dbapi_connection, connection_record):
+        if connection_record is None:
+            return
+        staged = connection_record.info.pop("cdc_staged", None)
+        connection_record.info.pop("cdc_pending", None)
+        if staged:
+            self.publish(staged)
+
+
+# 예제: session / Core 변경을 파일 로그와 콘솔로 전달
+def main():
+    import os
+    import tempfile
+
+    from sqlalchemy import create_engine, insert, update
+    from sqlalchemy.orm import Session
+
+    from tutorial_models import Address, Base, User
+
+    path = os.path.join(tempfile.mkdtemp(), "changes.log")
+    engine = create_engine(f"sqlite:///{path}.db")
+    Base.metadata.create_all(engine)
+
+    sink = FileSink(path)
+    stream = ChangeStream([sink, lambda batch: print("batch:", batch)])
+    stream.watch_session(Session).watch_engine(engine)
+
+    with Session(engine) as session:
+        ed = User(name="ed", fullname="Ed Jones",
+                  addresses=[Address(email_address="ed@google.com")])
+        session.add(ed)
+        session.commit()
+
+        ed.fullname = "Eddie Jones"
+        session.add(User(name="fake", fullname="Invalid"))
+        session.flush()
+        session.rollback()  # 전달되지 않음
+
+        ed.fullname = "Edward Jones"
+        session.commit()
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"name": "wendy", "fullname": "Wendy Williams"},
+                                    {"name": "mary", "fullname": "Mary Contrary"}])
+        conn.execute(update(User).where(User.name == "mary").values(fullname="Mary"))
+
+    stream.close()
+    sink.close()
+    with open(path, encoding="utf-8") as f:
+        print(f.read())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# federated join - 서로 다른 bind(DB) 에 있는 테이블을 client 에서 JOIN
+#
+#  autoload-tabel-model.py 의 TAB1(db1, MySQL) 과 TAB2(db2, Postgres) 는 SQL 로 JOIN 할 수 없다
+#  양쪽 select() 를 각자의 bind 에서 동시에 실행하고(thread), 결과를 배치 단위로 흘려보내며 JOIN
+#  #  how="hash": 오른쪽(build)을 key 별 dict 로 만들고 왼쪽(probe)을 흘려보내며 조회
+#  #  #  build 행 수가 max_build_rows 를 넘으면 양쪽을 key hash 로 나눠 임시 파일에 쓰고(spill)
+#  #  #  partition 별로 다시 JOIN (grace hash join) - 메모리 사용량 제한
+#  #  how="merge": 양쪽이 key 로 정렬되어 있을 때, 같은 key 묶음만 메모리에 두고 JOIN
+#  #  kind="left": 오른쪽에 짝이 없는 왼쪽 행은 (left, None) 으로 반환
+#  결과: (왼쪽 행, 오른쪽 행) tuple 쌍을 yield
+#
+#  사용법)
+#  #  left = Side(db.get_engine(bind="db1"), select(TAB1.__table__), "id")
+#  #  right = Side(db.get_engine(bind="db2"), select(TAB2.__table__), "tab1_id")
+#  #  for tab1, tab2 in federated_join(left, right):
+#  #      ...
+
+import os
+import pickle
+import queue
+import tempfile
+import threading
+from operator import itemgetter
+
+_DONE = object()
+
+
+class Side:
+
+    # key: 결과 컬럼 이름 (JOIN 조건 컬럼)
+    def __init__(self, bind, statement, key):
+        self.bind = bind
+        self.statement = statement
+        self.key = key
+
+
+class _Stream:
+    # select 결과를 background thread 에서 배치로 읽어 bounded queue 로 전달
+
+    def __init__(self, side, batch_size, prefetch):
+        self.side = side
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=prefetch)
+        self._keys = queue.Queue(maxsize=1)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        try:
+            with self.side.bind.connect() as conn:
+                result = conn.execution_options(stream_results=True).execute(self.side.statement)
+                self._keys.put(list(result.keys()))
+                for partition in result.partitions(self.batch_size):
+                    if not self._put([tuple(row) for row in partition]):
+                        return
+        except BaseException as error:
+            if self._keys.empty():
+                self._keys.put(error)
+            self._put(error)
+        else:
+            self._put(_DONE)
+
+    def key_getter(self):
+        keys = self._keys.get()
+        if isinstance(keys, BaseException):
+            raise keys
+        try:
+            return itemgetter(keys.index(self.side.key))
+        except ValueError:
+            raise KeyError(f"결과 컬럼에 JOIN key {self.side.key!r} 가 없음: {keys}") from None
+
+    def rows(self):
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield from item
+
+    def close(self):
+        self._stop.set()
+
+
+class _Spill:
+    # key hash 기준 partition 별 임시 파일 (pickle 배치로 저장)
+
+    def __init__(self, partitions, directory, prefix, flush_rows=1000):
+        self.partitions = partitions
+        self.flush_rows = flush_rows
+        self.paths = []
+        self.files = []
+        for i in range(partitions):
+            fd, path = tempfile.mkstemp(prefix=f"{prefix}{i}-", dir=directory)
+            self.paths.append(path)
+            self.files.append(os.fdopen(fd, "wb"))
+        self.buffers = [[] for _ in range(partitions)]
+
+    def add(self, key, row):
+        index = hash(key) % self.partitions
+        buffer = self.buffers[index]
+        buffer.append(row)
+        if len(buffer) >= self.flush_rows:
+            pickle.dump(buffer, self.files[index], pickle.HIGHEST_PROTOCOL)
+            buffer.clear()
+
+    def finish(self):
+        for buffer, f in zip(self.buffers, self.files):
+            if buffer:
+                pickle.dump(buffer, f, pickle.HIGHEST_PROTOCOL)
+            f.close()
+
+    def read(self, index):
+        with open(self.paths[index], "rb") as f:
+            while True:
+                try:
+                    yield from pickle.load(f)
+                except EOFError:
+                    return
+
+    def remove(self):
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# SQL 과 같이 NULL key 는 어떤 행과도 JOIN 되지 않음 (left join 이면 (row, None))
+def _build(rows, key):
+    table = {}
+    for row in rows:
+        value = key(row)
+        if value is not None:
+            table.setdefault(value, []).append(row)
+    return table
+
+
+def _probe(rows, key, table, kind):
+    for row in rows:
+        value = key(row)
+        matches = table.get(value) if value is not None else None
+        if matches:
+            for match in matches:
+                yield row, match
+        elif kind == "left":
+            yield row, None
+
+
+def _hash_join(left, right, left_key, right_key, kind, max_build_rows, partitions, directory):
+    table = {}
+    count = 0
+    right_rows = right.rows()
+    for row in right_rows:
+        value = right_key(row)
+        if value is None:
+            continue
+        table.setdefault(value, []).append(row)
+        count += 1
+        if count > max_build_rows:
+            break
+    else:
+        yield from _probe(left.rows(), left_key, table, kind)
+        return
+
+    # build 쪽이 너무 큼: 양쪽을 partition 으로 나눠 디스크에 쓰고 partition 별로 JOIN
+    right_spill = _Spill(partitions, directory, "fj-right-")
+    left_spill = _Spill(partitions, directory, "fj-left-")
+    try:
+        for rows in table.values():
+            for row in rows:
+                right_spill.add(right_key(row), row)
+        table = None
+        for row in right_rows:
+            value = right_key(row)
+            if value is not None:
+                right_spill.add(value, row)
+        right_spill.finish()
+
+        for row in left.rows():
+            value = left_key(row)
+            if value is not None:
+                left_spill.add(value, row)
+            elif kind == "left":
+                yield row, None
+        left_spill.finish()
+
+        for index in range(partitions):
+            table = _build(right_spill.read(index), right_key)
+            yield from _probe(left_spill.read(index), left_key, table, kind)
+    finally:
+        right_spill.remove()
+        left_spill.remove()
+
+
+def _merge_join(left, right, left_key, right_key, kind):
+    right_rows = (row for row in right.rows() if right_key(row) is not None)
+    pending = next(right_rows, None)
+    group_key, group = None, []
+    last_left = last_right = None
+
+    def advance_group():
+        # 같은 key 를 가진 오른쪽 행 묶음 읽기
+        nonlocal pending, last_right
+        key = right_key(pending)
+        if last_right is not None and key < last_right:
+            raise ValueError("merge join: 오른쪽 결과가 key 로 정렬되어 있지 않음")
+        last_right = key
+        rows = []
+        while pending is not None and right_key(pending) == key:
+            rows.append(pending)
+            pending = next(right_rows, None)
+        return key, rows
+
+    for row in left.rows():
+        key = left_key(row)
+        if key is None:
+            if kind == "left":
+                yield row, None
+            continue
+        if last_left is not None and key < last_left:
+            raise ValueError("merge join: 왼쪽 결과가 key 로 정렬되어 있지 않음")
+        last_left = key
+
+        while pending is not None and (not group or group_key < key) and right_key(pending) <= key:
+            group_key, group = advance_group()
+        if group and group_key == key:
+            for match in group:
+                yield row, match
+        elif kind == "left":
+            yield row, None
+
+
+def federated_join(left, right, how="hash", kind="inner", batch_size=1000, prefetch=4,
+                   max_build_rows=100000, partitions=16, directory=None):
+    if how not in ("hash", "merge"):
+        raise ValueError(f"알 수 없는 join 방식: {how!r} (hash, merge)")
+    if kind not in ("inner", "left"):
+        raise ValueError(f"알 수 없는 join 종류: {kind!r} (inner, left)")
+
+    # 양쪽 질의를 동시에 시작
+    left_stream = _Stream(left, batch_size, prefetch)
+    right_stream = _Stream(right, batch_size, prefetch)
+    try:
+        left_key = left_stream.key_getter()
+        right_key = right_stream.key_getter()
+        if how == "hash":
+            yield from _hash_join(left_stream, right_stream, left_key, right_key, kind,
+                                  max_build_rows, partitions, directory)
+        else:
+            yield from _merge_join(left_stream, right_stream, left_key, right_key, kind)
+    finally:
+        left_stream.close()
+        right_stream.close()
+
+
+# 예제: sqlite 파일 두개를 db1, db2 로 사용
+def main():
+    from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, select
+
+    directory = tempfile.mkdtemp()
+    db1 = create_engine(f"sqlite:///{os.path.join(directory, 'db1.db')}")
+    db2 = create_engine(f"sqlite:///{os.path.join(directory, 'db2.db')}")
+
+    metadata = MetaData()
+    tab1 = Table("rupi_tbl_db1", metadata,
+                 Column("id", Integer, primary_key=True),
+                 Column("name", String(50)))
+    tab2 = Table("rupi_tbl_db2", metadata,
+                 Column("id", Integer, primary_key=True),
+                 Column("tab1_id", Integer),
+                 Column("value", String(50)))
+    tab1.create(db1)
+    tab2.create(db2)
+    with db1.begin() as conn:
+        conn.execute(tab1.insert(), [{"id": i, "name": f"name{i}"} for i in range(1000)])
+    with db2.begin() as conn:
+        conn.execute(tab2.insert(), [{"tab1_id": i % 1200, "value": f"value{i}"}
+                                     for i in range(3000)])
+
+    left = Side(db1, select(tab1).order_by(tab1.c.id), "id")
+    right = Side(db2, select(tab2).order_by(tab2.c.tab1_id), "tab1_id")
+
+    hashed = sorted(federated_join(left, right))
+    spilled = sorted(federated_join(left, right, max_build_rows=500))
+    merged = sorted(federated_join(left, right, how="merge"))
+    outer = list(federated_join(left, Side(db2, select(tab2).where(tab2.c.id < 10), "tab1_id"),
+                                kind="left"))
+    print(len(hashed), hashed == spilled == merged, len(outer), outer[:3])
+
+
+if __name__ == "__main__":
+    main()
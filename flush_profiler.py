@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# flush profiler - commit(flush) 때 unit of work 가 실제로 실행하는 내용 기록
+#
+#  session.dirty / session.new 로 변경 대상은 볼 수 있지만, flush 가 어떤 순서로
+#  어떤 문장을 몇번 실행하는지, 시간이 어디서 걸리는지는 보이지 않는다
+#  flush 마다 기록하는 내용
+#  #  plan: mapper 별 INSERT/UPDATE/DELETE (실행된 순서 = 의존성 정렬 순서)
+#  #  문장 수, 행 수, executemany(배치) 실행 수, 한 행씩 실행된 수와 그 이유
+#  #  전체 flush 시간 = DB 실행 시간 + ORM 처리(bookkeeping) 시간
+#
+#  사용법)
+#  #  profiler = FlushProfiler().attach(session, engine)
+#  #  session.commit()
+#  #  print(profiler.last.format())
+
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import event, inspect
+
+
+class StatementStat:
+
+    def __init__(self, mapper, table, op):
+        self.mapper = mapper
+        self.table = table
+        self.op = op
+        self.statements = 0
+        self.rows = 0
+        self.batched = 0
+        self.single = 0
+        self.reasons = Counter()
+        self.db_time = 0.0
+
+    @property
+    def name(self):
+        return self.mapper.class_.__name__ if self.mapper is not None else self.table
+
+
+class FlushReport:
+
+    def __init__(self, new, dirty, deleted):
+        self.new = new
+        self.dirty = dirty
+        self.deleted = deleted
+        self.plan = {}
+        self.total_time = 0.0
+        self.db_time = 0.0
+        self.failed = False
+
+    @property
+    def orm_time(self):
+        return max(0.0, self.total_time - self.db_time)
+
+    def stat(self, mapper, table, op):
+        key = (table, op)
+        stat = self.plan.get(key)
+        if stat is None:
+            stat = self.plan[key] = StatementStat(mapper, table, op)
+        return stat
+
+    def format(self):
+        lines = [
+            f"flush: new={self.new} dirty={self.dirty} deleted={self.deleted} "
+            f"total={self.total_time * 1000:.2f}ms db={self.db_time * 1000:.2f}ms "
+            f"orm={self.orm_time * 1000:.2f}ms" + (" FAILED" if self.failed else "")
+        ]
+        for i, stat in enumerate(self.plan.values(), 1):
+            reasons = ", ".join(f"{reason} x{count}" for reason, count in stat.reasons.items())
+            lines.append(
+                f"  {i}. {stat.name:<16} {stat.op:<6} statements={stat.statements} "
+                f"rows={stat.rows} batched={stat.batched} single={stat.single} "
+                f"db={stat.db_time * 1000:.2f}ms" + (f" ({reasons})" if reasons else ""))
+        return "\n".join(lines)
+
+
+# cursor 실행 한번에 보낸 행 수
+#  #  insertmanyvalues: 여러 행을 VALUES (...), (...) 로 묶어 실행 (행이 1개씩이면 배치 아님)
+#  #  executemany: 파라미터 목록의 길이
+def _rows_in_call(context, parameters, executemany):
+    style = getattr(getattr(context, "execute_style", None), "name", "")
+    if style == "INSERTMANYVALUES":
+        per_row = len(context.compiled_parameters[0]) or 1
+        return max(1, len(parameters) // per_row)
+    if executemany:
+        return len(parameters)
+    return 1
+
+
+def _operation(context):
+    if context.isinsert:
+        return "INSERT"
+    if context.isupdate:
+        return "UPDATE"
+    if context.isdelete:
+        return "DELETE"
+    return None
+
+
+# 한 행씩 실행된 이유
+#  #  INSERT: pk 를 DB 에서 받아와야 하는데(RETURNING/lastrowid) 배치로 받을 수 없는 경우
+#  #  UPDATE: version id 확인, 또는 행마다 SET 컬럼 구성이 달라 묶을 수 없는 경우
+def _single_reason(context, mapper, op):
+    if op == "INSERT":
+        pk_missing = mapper is not None and any(
+            context.compiled_parameters[0].get(col.key) is None
+            for col in mapper.primary_key)
+        if pk_missing:
+            return "pk fetch"
+        return "single row"
+    if op == "UPDATE" and mapper is not None and mapper.version_id_col is not None:
+        return "version check"
+    if op == "UPDATE":
+        return "single row or distinct SET columns"
+    return "single row"
+
+
+class FlushProfiler:
+
+    def __init__(self, keep=100):
+        self.keep = keep
+        self.reports = []
+        self._local = threading.local()
+
+    @property
+    def last(self):
+        return self.reports[-1] if self.reports else None
+
+    # session: Session 인스턴스, sessionmaker 또는 Session 클래스
+    # engines: flush 가 사용하는 engine (DB 시간 측정용)
+    def attach(self, session, *engines):
+        event.listen(session, "before_flush", self._before_flush)
+        event.listen(session, "after_flush_postexec", self._after_flush)
+        event.listen(session, "after_rollback", self._after_rollback)
+        event.listen(session, "after_soft_rollback", self._after_rollback)
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._before_execute)
+            event.listen(engine, "after_cursor_execute", self._after_execute)
+        return self
+
+    def detach(self, session, *engines):
+        event.remove(session, "before_flush", self._before_flush)
+        event.remove(session, "after_flush_postexec", self._after_flush)
+        event.remove(session, "after_rollback", self._after_rollback)
+        event.remove(session, "after_soft_rollback", self._after_rollback)
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", self._before_execute)
+            event.remove(engine, "after_cursor_execute", self._after_execute)
+
+    def _before_flush(self, session, flush_context, instances):
+        report = FlushReport(len(session.new), len(session.dirty), len(session.deleted))
+        # table => mapper (flush 대상 객체의 mapper 기준)
+        mappers = {}
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            mapper = inspect(obj).mapper
+            for table in mapper.tables:
+                mappers.setdefault(table.name, mapper)
+        self._local.mappers = mappers
+        self._local.report = report
+        self._local.start = time.perf_counter()
+
+    def _after_flush(self, session, flush_context):
+        self._finish()
+
+    # flush 가 실패하면 after_flush_postexec 없이 rollback 됨: 실패한 flush 로 기록하고 종료
+    def _after_rollback(self, session, *args):
+        self._finish(failed=True)
+
+    def _finish(self, failed=False):
+        report = getattr(self._local, "report", None)
+        if report is None:
+            return
+        report.total_time = time.perf_counter() - self._local.start
+        report.failed = failed
+        self._local.report = None
+        self.reports.append(report)
+        del self.reports[:-self.keep]
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if getattr(self._local, "report", None) is not None:
+            context._flush_profiler_start = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        report = getattr(self._local, "report", None)
+        start = getattr(context, "_flush_profiler_start", None)
+        if report is None or start is None:
+            return
+        elapsed = time.perf_counter() - start
+        report.db_time += elapsed
+
+        op = _operation(context)
+        if op is None or context.compiled is None:
+            return
+        table = context.compiled.statement.table.name
+        mapper = self._local.mappers.get(table)
+        stat = report.stat(mapper, table, op)
+        stat.statements += 1
+        stat.db_time += elapsed
+
+        rows = _rows_in_call(context, parameters, executemany)
+        stat.rows += rows
+        if rows > 1:
+            stat.batched += 1
+        else:
+            stat.single += 1
+            stat.reasons[_single_reason(context, mapper, op)] += 1
+
+
+# 예제: 1.x 스크립트의 8) 단계와 같은 변경 후 commit
+def main():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from tutorial_models import Address, Base, User
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    profiler = FlushProfiler().attach(session, engine)
+
+    session.add_all([
+        User(name="ed", fullname="Ed Jones",
+             addresses=[Address(email_address="ed@google.com")]),
+        User(name="wendy", fullname="Wendy Williams"),
+    ])
+    session.commit()
+
+    ed = session.query(User).filter_by(name="ed").one()
+    wendy = session.query(User).filter_by(name="wendy").one()
+    ed.fullname = "Eddie Jones"
+    wendy.name = "windy"
+    session.add_all([User(id=100 + i, name=f"user{i}", fullname="") for i in range(5)])
+    session.delete(ed)
+    session.commit()
+
+    for report in profiler.reports:
+        print(report.format())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# 동시성 부하 테스트 - tutorial 스크립트의 읽기/쓰기 작업을 N 개 thread 에서 실행
+#
+#  작업 종류 (sqlalchemy-2-style.py 의 4) ~ 8) 단계)
+#  #  insert: User + Address 생성
+#  #  select: name 으로 User 조회
+#  #  join: Address.email_address 로 User JOIN 조회
+#  #  update: User.fullname 변경
+#  #  delete: User 삭제 (cascade 로 Address 도 삭제)
+#  SQLite WAL 모드, session 은 session_scope() 로 thread 마다 생성/정리
+#  #  lock 대기는 sqlite busy timeout 대신 재시도로 처리해서 횟수/대기시간을 측정
+#
+#  사용법)
+#  #  python loadtest.py --threads 1,2,4,8 --duration 3
+#  #  출력: thread 수별 처리량(ops/s), p50/p95/p99 지연시간, lock 재시도 횟수/대기시간
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from schema_ensure import ensure_schema
+from session_scope import session_registry, session_scope
+from tutorial_models import Address, Base, User
+
+# 작업 비율 (읽기 위주)
+WORKLOAD = [
+    ("insert", 20),
+    ("select", 35),
+    ("join", 25),
+    ("update", 15),
+    ("delete", 5),
+]
+
+
+def make_engine(path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 0})
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    return engine
+
+
+def _is_locked(error):
+    return "locked" in str(error.orig) or "busy" in str(error.orig)
+
+
+class Stats:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.ops = Counter()
+        self.errors = Counter()
+        self.lock_retries = 0
+        self.lock_wait = 0.0
+        self.elapsed = 0.0
+
+    def record(self, op, latency, retries, waited):
+        with self.lock:
+            self.latencies.append(latency)
+            self.ops[op] += 1
+            self.lock_retries += retries
+            self.lock_wait += waited
+
+    def percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+class Worker:
+
+    def __init__(self, registry, worker_id, rnd):
+        self.registry = registry
+        self.worker_id = worker_id
+        self.random = rnd
+        self.seq = 0
+        self.own_ids = []
+
+    def _name(self):
+        self.seq += 1
+        return f"w{self.worker_id}-{self.seq}"
+
+    def insert(self, session):
+        name = self._name()
+        user = User(name=name, fullname=name.upper(),
+                    addresses=[Address(email_address=f"{name}@sqlalchemy.org"),
+                               Address(email_address=f"{name}@squirrelpower.org")])
+        session.add(user)
+        session.flush()
+        return user.id
+
+    def select(self, session):
+        name = f"w{self.worker_id}-{self.random.randint(1, max(1, self.seq))}"
+        session.scalars(select(User).where(User.name == name)).first()
+
+    def join(self, session):
+        name = f"w{self.worker_id}-{self.random.randint(1, max(1, self.seq))}"
+        stmt = select(Address).join(Address.user).where(
+            Address.email_address == f"{name}@sqlalchemy.org")
+        session.scalars(stmt).one_or_none()
+
+    def update(self, session, user_id):
+        if user_id is None:
+            return
+        user = session.get(User, user_id)
+        if user is not None:
+            user.fullname = f"{user.name} updated"
+
+    def delete(self, session, user_id):
+        if user_id is None:
+            return
+        user = session.get(User, user_id)
+        if user is not None:
+            session.delete(user)
+
+    # 대상 id 는 재시도 루프 밖에서 한번만 선택 (재시도마다 다른 행을 고르거나 id 를 잃지 않도록)
+    def _args(self, op):
+        if op == "update":
+            return (self.random.choice(self.own_ids) if self.own_ids else None,)
+        if op == "delete":
+            return (self.own_ids.pop() if self.own_ids else None,)
+        return ()
+
+    def run_once(self, op, stats):
+        retries = 0
+        waited = 0.0
+        args = self._args(op)
+        start = time.perf_counter()
+        while True:
+            try:
+                with session_scope(self.registry) as session:
+                    result = getattr(self, op)(session, *args)
+                break
+            except OperationalError as error:
+                if not _is_locked(error):
+                    raise
+                retries += 1
+                backoff = min(0.05, 0.0005 * 2 ** min(retries, 7))
+                backoff *= self.random.random() + 0.5
+                time.sleep(backoff)
+                waited += backoff
+        if op == "insert":
+            self.own_ids.append(result)
+        stats.record(op, time.perf_counter() - start, retries, waited)
+
+
+def run_level(engine, threads, duration, seed=0):
+    registry = session_registry(sessionmaker(bind=engine), scope="thread")
+    stats = Stats()
+    ops, weights = zip(*WORKLOAD)
+    deadline = time.perf_counter() + duration
+
+    def loop(worker_id):
+        rnd = random.Random(seed * 1000 + worker_id)
+        worker = Worker(registry, f"{threads}x{worker_id}", rnd)
+        while time.perf_counter() < deadline:
+            op = rnd.choices(ops, weights)[0]
+            try:
+                worker.run_once(op, stats)
+            except Exception as error:
+                with stats.lock:
+                    stats.errors[type(error).__name__] += 1
+
+    pool = [threading.Thread(target=loop, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def report(threads, stats):
+    total = sum(stats.ops.values())
+    print(f"{threads:>7} {total / stats.elapsed:10.1f} "
+          f"{stats.percentile(0.50) * 1000:8.2f} {stats.percentile(0.95) * 1000:8.2f} "
+          f"{stats.percentile(0.99) * 1000:8.2f} {stats.lock_retries:8d} "
+          f"{stats.lock_wait * 1000:10.1f} {sum(stats.errors.values()):6d}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="session-per-thread load test (SQLite WAL)")
+    parser.add_argument("--threads", default="1,2,4,8",
+                        help="동시 thread 수 목록 (콤마 구분)")
+    parser.add_argument("--duration", type=float, default=3.0,
+                        help="thread 수별 실행 시간(초)")
+    parser.add_argument("--db", default=None, help="sqlite 파일 경로 (기본값: 임시 파일)")
+    args = parser.parse_args(argv)
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "loadtest.db")
+    engine = make_engine(path)
+    ensure_schema(Base.metadata, engine)
+
+    print(f"db: {path}")
+    print(f"{'threads':>7} {'ops/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'retries':>8} {'wait ms':>10} {'errors':>6}")
+    for threads in [int(n) for n in args.threads.split(",")]:
+        report(threads, run_level(engine, threads, args.duration))
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,8 @@
 from typing import Optional
 import sqlmodel as sm
 from sqlmodel import SQLModel, Session, text, Field
-from sqlalchemy.ext import declarative_base
+from sqlalchemy import Column, ForeignKeyConstraint, Integer, String, Table, UniqueConstraint
+from sqlalchemy.orm import declarative_base
 
 # sqlmodel table
 # SQLModel 정석적인 형태
@@ -45,7 +46,8 @@ class Hero(sm.SQLModel, table=True):
         sm.Column("age", sm.Integer, default=None),
         mysql_engine='InnoDB',
         extend_existing=True,
-        autoload_with=db_engine,
+        # autoload_with=db_engine 는 import 시점에 DB 접속이 필요하므로 사용하지 않음
+        # 컬럼을 모두 선언했으므로 reflection 불필요 (필요하면 DeferredReflection 사용)
     )
 
 # sqlalchemy table
@@ -62,18 +64,26 @@ class User(Base):
     nickname = Column(String)
 
 # 옵션 사용
-class MyClass(Base):
+#  #  매핑 클래스에는 primary key 가 있어야 하고, 같은 metadata 에 테이블 이름이 겹치면 안 됨
+class Department(Base):
     __tablename__ = 'departments'
     __table_args__ = {'mysql_engine':'InnoDB'}
 
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50))
+
 # 옵션에 제약사항 사용
-class MyClass(Base):
-    __tablename__ = 'departments'
+class Member(Base):
+    __tablename__ = 'members'
     __table_args__ = (
-            ForeignKeyConstraint(['id'], ['remote_table.id']),
+            ForeignKeyConstraint(['department_id'], ['departments.id']),
             UniqueConstraint('foo'),
             )
 
+    id = Column(Integer, primary_key=True)
+    department_id = Column(Integer)
+    foo = Column(String(50))
+
 # 클래식 매핑: metadata(registry) 만 사용
 class MyClass(Base):
     __table__ = Table('my_table', Base.metadata,
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# named query registry - text() SQL 을 이름으로 등록해 두고 재사용
+#
+#  text("SELECT * FROM users WHERE name=:name_1") 를 호출할 때마다 만들면
+#  #  매번 문장 생성/파싱, SELECT * 결과 컬럼에는 타입 정보도 없음
+#  #  SQL 오타는 해당 요청이 실행될 때가 되어서야 발견됨
+#  registry 에 시작 시점에 한번 등록
+#  #  bind 파라미터 검증 (선언한 params 와 SQL 의 :name 이 다르면 등록 에러)
+#  #  columns 로 결과 컬럼 타입 지정, entity 를 주면 from_statement 로 ORM 객체로 조회
+#  #  prepare(engine): dialect 별로 컴파일해서 에러 확인, check=True 면 DB 에 실제로 질의해서 검증
+#  #  #  실행시 컴파일 결과는 engine 의 compiled cache 가 재사용 (같은 text() 객체를 쓰므로 cache hit)
+#
+#  사용법)
+#  #  queries = QueryRegistry()
+#  #  queries.register("user_by_name",
+#  #                   "SELECT id, name, fullname, nickname FROM users WHERE name=:name",
+#  #                   params=["name"], entity=User)
+#  #
+#  #  @queries.query(columns=[User.id, User.name])
+#  #  def users_like():
+#  #      return "SELECT id, name FROM users WHERE name LIKE :pattern"
+#  #
+#  #  queries.load_file("queries.sql")   # -- name: <이름> 으로 구분된 SQL 파일
+#  #  queries.prepare(engine, check=True)
+#  #  users = queries.execute(session, "user_by_name", name="ed").all()
+
+import re
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, scoped_session
+
+_NAME_LINE = re.compile(r"^--\s*name:\s*(\S+)\s*$", re.MULTILINE)
+
+
+class QueryError(ValueError):
+    pass
+
+
+class NamedQuery:
+
+    def __init__(self, name, sql, statement, params, entity=None):
+        self.name = name
+        self.sql = sql
+        self.statement = statement
+        self.params = params
+        self.entity = entity
+        # entity 조회용 ORM 문장도 한번만 생성
+        self.orm_statement = select(entity).from_statement(statement) \
+            if entity is not None else None
+
+    def check_params(self, params):
+        given = set(params)
+        missing = self.params - given
+        extra = given - self.params
+        if missing or extra:
+            raise QueryError(f"{self.name}: 파라미터 불일치 "
+                             f"(누락: {sorted(missing)}, 알 수 없음: {sorted(extra)})")
+
+    def __repr__(self):
+        return f"NamedQuery({self.name!r}, params={sorted(self.params)})"
+
+
+def _bind_names(statement):
+    return frozenset(statement.compile().params)
+
+
+class QueryRegistry:
+
+    def __init__(self):
+        self._queries = {}
+
+    def __getitem__(self, name):
+        try:
+            return self._queries[name]
+        except KeyError:
+            raise QueryError(f"등록되지 않은 query: {name!r}") from None
+
+    def __contains__(self, name):
+        return name in self._queries
+
+    def __iter__(self):
+        return iter(self._queries.values())
+
+    # columns: Column/ORM 속성 목록 또는 {"컬럼 이름": 타입} (결과 컬럼 타입 지정)
+    # params: 사용할 bind 파라미터 이름 (주면 SQL 과 비교해서 다르면 에러)
+    def register(self, name, sql, params=None, columns=None, entity=None):
+        if name in self._queries:
+            raise QueryError(f"이미 등록된 query: {name!r}")
+
+        statement = text(sql)
+        found = _bind_names(statement)
+        if params is not None and set(params) != found:
+            raise QueryError(f"{name}: 선언한 파라미터 {sorted(params)} 와 "
+                             f"SQL 의 파라미터 {sorted(found)} 가 다름")
+
+        if isinstance(columns, dict):
+            statement = statement.columns(**columns)
+        elif columns:
+            statement = statement.columns(*columns)
+
+        query = self._queries[name] = NamedQuery(name, sql, statement, found, entity)
+        return query
+
+    # 함수가 반환하는 SQL 을 함수 이름(또는 name)으로 등록하는 decorator
+    def query(self, name=None, **kw):
+        def decorator(fn):
+            self.register(name or fn.__name__, fn(), **kw)
+            return fn
+        return decorator
+
+    # "-- name: 이름" 줄로 구분된 SQL 파일 읽기
+    def load_file(self, path, **kw):
+        with open(path, encoding="utf-8") as f:
+            content = f.read()
+        parts = _NAME_LINE.split(content)
+        if parts[0].strip():
+            raise QueryError(f"{path}: '-- name:' 이전에 SQL 이 있음")
+        for name, sql in zip(parts[1::2], parts[2::2]):
+            sql = sql.strip().rstrip(";")
+            if not sql:
+                raise QueryError(f"{path}: {name} 의 SQL 이 비어 있음")
+            self.register(name, sql, **kw)
+
+    # dialect 별로 컴파일되는지 확인, check=True 면 SELECT 문을 DB 에서 결과 없이 실행해서 검증
+    #  #  SELECT * FROM (<sql>) AS q WHERE 1 = 0 형태로 실행 (파라미터는 모두 NULL)
+    def prepare(self, *binds, check=False):
+        for bind in binds:
+            for query in self._queries.values():
+                try:
+                    query.statement.compile(dialect=bind.dialect)
+                except Exception as error:
+                    raise QueryError(f"{query.name}: 컴파일 실패 - {error}") from error
+            if check:
+                self._check(bind)
+
+    def _check(self, bind):
+        connection = bind.connect() if isinstance(bind, Engine) else bind
+        try:
+            for query in self._queries.values():
+                if not re.match(r"\s*(select|with)\b", query.sql, re.IGNORECASE):
+                    continue
+                probe = text(f"SELECT * FROM ({query.sql}) AS q WHERE 1 = 0")
+                try:
+                    with connection.begin_nested() if connection.in_transaction() \
+                            else connection.begin():
+                        connection.execute(probe, {key: None for key in query.params}).all()
+                except Exception as error:
+                    raise QueryError(f"{query.name}: 검증 실패 - {error}") from error
+        finally:
+            if connection is not bind:
+                connection.close()
+
+    def sql(self, name, dialect):
+        return str(self[name].statement.compile(dialect=dialect))
+
+    # session 또는 connection 으로 실행 (entity 가 있으면 ORM 객체로 조회)
+    def execute(self, executor, name, /, **params):
+        query = self[name]
+        query.check_params(params)
+        if query.orm_statement is not None and isinstance(executor, (Session, scoped_session)):
+            return executor.scalars(query.orm_statement, params)
+        return executor.execute(query.statement, params)
+
+
+# 예제: 1.x 스크립트의 14) 단계 문장을 registry 로 사용
+def main():
+    from sqlalchemy import create_engine
+
+    from tutorial_models import Base, User
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    queries = QueryRegistry()
+    queries.register("user_by_name",
+                     "SELECT id, name, fullname FROM user_account WHERE name=:name",
+                     params=["name"], entity=User)
+
+    @queries.query(columns=[User.id, User.name])
+    def users_like():
+        return "SELECT id, name FROM user_account WHERE name LIKE :pattern"
+
+    queries.prepare(engine, check=True)
+    print(queries.sql("user_by_name", engine.dialect))
+
+    with Session(engine) as session:
+        session.add_all([User(name="ed", fullname="Ed Jones"),
+                         User(name="fred", fullname="Fred Flintstone")])
+        session.commit()
+
+        print(queries.execute(session, "user_by_name", name="ed").all())
+        print(queries.execute(session, "users_like", pattern="%ed").all())
+
+    # 오타는 시작 시점에 발견
+    queries.register("broken", "SELECT id, nmae FROM user_account")
+    try:
+        queries.prepare(engine, check=True)
+    except QueryError as error:
+        print(error)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,24 +11,34 @@ from pydantic import BaseModel
 from sqlalchemy.orm import declarative_base # 1.4
 #  from sqlalchemy.orm import DeclarativeBase # 2.0
 from sqlalchemy import Table, select
+from sqlalchemy.ext.declarative import DeferredReflection
 
 # db connection info
+# create_engine 은 실제 접속을 하지 않음 (첫 질의 때 연결)
 db_string = "mysql+pymysql://{}:{}@{}:{}/{}".format("rupi", quote_plus("rupi@@1234"), "localhost", "33062", "rupi_db")
 db_engine = create_engine(db_string, echo=True)
 
 # Base
 Base = declarative_base()
-Base.metadata.reflect(db_engine)
+#  import 시점의 reflect 는 DB 접속이 필요하므로 사용하지 않음
+#  Base.metadata.reflect(db_engine)
 #  class Departments(Base):
     #  __table__ = Table('departments', Base.metadata, autoload=True, autoload_with=db_engine)
 
-Base.metadata.reflect(db_engine)
 
-class Departments(Base):
-    __table__ = Base.metadata.tables["departments"]
+# DeferredReflection: 선언만 해두고, reflection 은 prepare(engine) 호출 시점에 수행
+class Reflected(DeferredReflection):
+    __abstract__ = True
+
+
+class Departments(Reflected, Base):
+    __tablename__ = "departments"
+
 
 def main():
     # db connection
+    # 여기서 reflection 수행 (import 가 아닌 실행 시점에 binding)
+    Reflected.prepare(db_engine)
 
     # create db session
     with db_engine.connect() as conn:
@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# 병렬 table scan - primary key 범위로 나눠 여러 process 에서 조회
+#
+#  select * from departments 같은 전체 조회는 connection 하나, CPU core 하나로 처리된다
+#  pk 범위(partition) 별로 worker process 가 각자 engine 을 만들어 조회/처리
+#  #  partition 나누기: minmax(정수 pk 의 min~max 균등 분할) 또는 quantile(pk 분포 기준)
+#  #  결과: 배치(batch) 단위로 읽는 즉시 받거나, map_fn/reduce_fn 으로 worker 에서 집계한 값만 받음
+#  #  map_fn, reduce_fn 은 pickle 가능해야 함 (모듈 최상위 함수)
+#
+#  사용법)
+#  #  for batch in parallel_scan("sqlite:///tuto.db", User):
+#  #      ...
+#  #  total = parallel_map_reduce("sqlite:///tuto.db", "departments", count_rows, operator.add, 0)
+
+import functools
+import multiprocessing
+import os
+import queue
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from sqlalchemy import MetaData, Table, create_engine, func, inspect, select
+
+_PARTITION_DONE = "__partition_done__"
+
+# worker process 별 engine/table 캐시
+_engines = {}
+_tables = {}
+
+
+def _engine(url):
+    engine = _engines.get(url)
+    if engine is None:
+        engine = _engines[url] = create_engine(url)
+    return engine
+
+
+def _worker_table(url, table_name):
+    table = _tables.get((url, table_name))
+    if table is None:
+        table = Table(table_name, MetaData(), autoload_with=_engine(url))
+        _tables[(url, table_name)] = table
+    return table
+
+
+# 매핑 클래스, Table, 테이블 이름 모두 허용
+def _table_name(target):
+    if isinstance(target, str):
+        return target
+    if isinstance(target, Table):
+        return target.name
+    return inspect(target).local_table.name
+
+
+def _pk_column(table):
+    columns = list(table.primary_key.columns)
+    if len(columns) != 1:
+        raise ValueError(f"{table.name}: 단일 컬럼 primary key 만 partition 가능")
+    return columns[0]
+
+
+# pk 범위 목록: [(lo, hi), ...] lo 포함, hi 미포함 (None 은 제한 없음)
+#  #  quantile: ORDER BY random() LIMIT sample_size 로 뽑은 pk 표본의 분위수 (범위는 근사치)
+def pk_partitions(engine, target, partitions, method="minmax", sample_size=10000):
+    table = target if isinstance(target, Table) else \
+        Table(_table_name(target), MetaData(), autoload_with=engine)
+    pk = _pk_column(table)
+
+    with engine.connect() as conn:
+        if method == "minmax":
+            low, high = conn.execute(select(func.min(pk), func.max(pk))).one()
+            if low is None:
+                return []
+            step = max(1, -(-(high - low + 1) // partitions))
+            bounds = list(range(low, high + 1, step))[1:]
+        elif method == "quantile":
+            # pk 표본(한번의 질의)을 정렬해서 분위수를 경계로 사용
+            random = func.rand() if engine.dialect.name in ("mysql", "mariadb") \
+                else func.random()
+            sample = sorted(conn.execute(
+                select(pk).order_by(random).limit(sample_size)).scalars())
+            if not sample:
+                return []
+            bounds = []
+            for i in range(1, partitions):
+                value = sample[len(sample) * i // partitions]
+                if not bounds or value > bounds[-1]:
+                    bounds.append(value)
+        else:
+            raise ValueError(f"알 수 없는 partition 방식: {method!r} (minmax, quantile)")
+
+    edges = [None] + bounds + [None]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+# parallel_scan 용 worker 초기화: 배치를 돌려보낼 queue, 소비자가 중단했을 때의 stop event
+_batches = None
+_stop = None
+
+
+def _init_stream(batches, stop):
+    global _batches, _stop
+    _batches = batches
+    _stop = stop
+    # 소비자가 중단하면 feeder thread 에 남은 배치를 기다리지 않고 process 종료
+    #  #  정상 종료시에는 부모가 partition 완료 표시까지 모두 받으므로 버려지는 배치 없음
+    batches.cancel_join_thread()
+
+
+def _send(item):
+    while not _stop.is_set():
+        try:
+            _batches.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _scan_partition(url, table_name, bounds, batch_size, map_fn, reduce_fn):
+    table = _worker_table(url, table_name)
+    pk = _pk_column(table)
+    low, high = bounds
+
+    stmt = select(table).order_by(pk)
+    if low is not None:
+        stmt = stmt.where(pk >= low)
+    if high is not None:
+        stmt = stmt.where(pk < high)
+
+    reduced = None
+    try:
+        with _engine(url).connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(stmt)
+            for partition in result.partitions(batch_size):
+                rows = [tuple(row) for row in partition]
+                if map_fn is None:
+                    # 읽는 동안 배치 단위로 부모 process 에 전달
+                    if not _send(rows):
+                        return None
+                    continue
+                value = map_fn(rows)
+                reduced = value if reduced is None else reduce_fn(reduced, value)
+    finally:
+        if map_fn is None:
+            _send(_PARTITION_DONE)
+    return reduced
+
+
+def _submit_all(pool, url, target, partitions, batch_size, map_fn, reduce_fn):
+    table_name = _table_name(target)
+    task = functools.partial(_scan_partition, url, table_name,
+                             batch_size=batch_size, map_fn=map_fn, reduce_fn=reduce_fn)
+    return [pool.submit(task, bounds) for bounds in partitions]
+
+
+# 기본 partition 수: process 당 4개 (범위별 데이터 편차 완화)
+def _plan(url, target, processes, partitions, method):
+    processes = processes or os.cpu_count() or 1
+    if partitions is None or isinstance(partitions, int):
+        engine = create_engine(url)
+        try:
+            partitions = pk_partitions(engine, target, partitions or processes * 4, method)
+        finally:
+            engine.dispose()
+    return processes, partitions
+
+
+# worker 가 읽는 대로 배치(list of tuple) 를 yield (partition 들의 배치가 섞여서 나옴)
+#  #  queue 크기(processes * prefetch 배치)를 넘으면 worker 가 대기 (부모 메모리 제한)
+def parallel_scan(url, target, processes=None, partitions=None, method="minmax",
+                  batch_size=1000, prefetch=4):
+    processes, partitions = _plan(url, target, processes, partitions, method)
+    context = multiprocessing.get_context()
+    batches = context.Queue(maxsize=processes * prefetch)
+    stop = context.Event()
+    with ProcessPoolExecutor(processes, mp_context=context, initializer=_init_stream,
+                             initargs=(batches, stop)) as pool:
+        futures = _submit_all(pool, url, target, partitions, batch_size, None, None)
+        remaining = len(futures)
+        try:
+            while remaining:
+                try:
+                    item = batches.get(timeout=0.1)
+                except queue.Empty:
+                    # worker 에서 예외가 나면 바로 전달
+                    for future in futures:
+                        if future.done() and future.exception() is not None:
+                            raise future.exception()
+                    continue
+                if item == _PARTITION_DONE:
+                    remaining -= 1
+                else:
+                    yield item
+            for future in futures:
+                future.result()
+        finally:
+            # 중간에 멈춘 경우: 남은 partition 취소, 실행 중인 worker 가 끝날 때까지 queue 를 비움
+            #  #  (pipe 가 가득 차 있으면 worker 가 put 에서 멈춰 종료하지 못함)
+            stop.set()
+            for future in futures:
+                future.cancel()
+            while not all(future.done() for future in futures):
+                try:
+                    batches.get(timeout=0.05)
+                except queue.Empty:
+                    pass
+
+
+# worker 에서 map_fn(batch) 결과를 reduce_fn 으로 집계, 마지막에 partition 결과를 다시 집계
+def parallel_map_reduce(url, target, map_fn, reduce_fn, initial=None, processes=None,
+                        partitions=None, method="minmax", batch_size=1000):
+    processes, partitions = _plan(url, target, processes, partitions, method)
+    result = initial
+    with ProcessPoolExecutor(processes) as pool:
+        futures = _submit_all(pool, url, target, partitions, batch_size, map_fn, reduce_fn)
+        for future in as_completed(futures):
+            value = future.result()
+            if value is None:
+                continue
+            result = value if result is None else reduce_fn(result, value)
+    return result
+
+
+# 예제: CPU 를 쓰는 행 처리 (문자열 해시 반복)
+def checksum_rows(rows):
+    import hashlib
+
+    total = 0
+    for row in rows:
+        digest = repr(row).encode()
+        for _ in range(20):
+            digest = hashlib.sha256(digest).digest()
+        total += digest[0]
+    return total
+
+
+def _add(a, b):
+    return a + b
+
+
+def main(rows=200000):
+    import tempfile
+    import time
+
+    from schema_ensure import ensure_schema
+    from tutorial_models import Base, User
+
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'scan.db')}"
+    engine = create_engine(url)
+    ensure_schema(Base.metadata, engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"name": f"user{i}", "fullname": f"User {i}"} for i in range(rows)
+        ])
+
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        expected = checksum_rows(tuple(row) for row in conn.execute(select(User.__table__)))
+    print(f"single process {time.perf_counter() - start:8.2f} s")
+
+    for processes in (2, 4):
+        start = time.perf_counter()
+        total = parallel_map_reduce(url, User, checksum_rows, _add, processes=processes)
+        print(f"{processes} processes    {time.perf_counter() - start:8.2f} s")
+        assert total == expected
+
+    count = sum(len(batch) for batch in parallel_scan(url, User, processes=2,
+                                                      method="quantile"))
+    print("rows:", count)
+
+    # 첫 배치만 읽고 중단 (남은 worker 정리 후 바로 반환)
+    start = time.perf_counter()
+    scan = parallel_scan(url, User, processes=2)
+    for batch in scan:
+        break
+    scan.close()
+    print(f"early stop {time.perf_counter() - start:8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
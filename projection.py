@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# 읽기 전용 projection - ORM 객체 대신 __slots__ 기반 record 로 조회
+#
+#  select(User) 로 가져온 객체는 identity map 등록, instrumented attribute, 상태 추적 비용이 든다
+#  #  name/fullname 만 읽는 루프나 API 응답용 조회에는 필요 없는 비용
+#  project() 는 같은 쿼리를 컬럼 조회로 바꿔 실행하고, 행마다 가벼운 record 를 만든다
+#  #  record 클래스는 (mapper, 컬럼 목록) 마다 한번만 생성해서 재사용
+#  #  record 는 immutable (속성 변경 불가), session 에 들어가지 않음
+#
+#  사용법)
+#  #  for user in project(session, select(User).where(User.name == 'ed')):
+#  #      print(user.name, user.fullname)
+#  #  stmt = text("SELECT id, name FROM users WHERE name=:name").columns(User.id, User.name)
+#  #  project(session, stmt, {"name": "ed"}, entity=User)
+
+import keyword
+
+from sqlalchemy import inspect
+
+_record_classes = {}
+
+# record 클래스 속성, 생성된 __init__ 의 인자/전역 이름과 겹치는 컬럼 이름
+_RESERVED = frozenset(["self", "_set", "_astuple", "_asdict"])
+
+
+def _frozen_setattr(self, key, value):
+    raise AttributeError(f"{type(self).__name__} is read-only")
+
+
+def _repr(self):
+    values = ", ".join(f"{key}={getattr(self, key)!r}" for key in self.__slots__)
+    return f"{type(self).__name__}({values})"
+
+
+def _eq(self, other):
+    if type(other) is not type(self):
+        return NotImplemented
+    return self._astuple() == other._astuple()
+
+
+def _hash(self):
+    return hash(self._astuple())
+
+
+def _astuple(self):
+    return tuple(getattr(self, key) for key in self.__slots__)
+
+
+def _asdict(self):
+    return {key: getattr(self, key) for key in self.__slots__}
+
+
+# record 클래스 생성 (캐시)
+#  #  __init__ 은 컬럼 목록에 맞춰 코드 생성: 행마다 루프/kwargs 처리 없이 slot 에 바로 저장
+def record_class(fields, entity=None):
+    fields = tuple(fields)
+    cache_key = (entity, fields)
+    cls = _record_classes.get(cache_key)
+    if cls is not None:
+        return cls
+
+    seen = set()
+    for field in fields:
+        if (not field.isidentifier() or keyword.iskeyword(field)
+                or field in _RESERVED or field.startswith("__")):
+            raise ValueError(f"projection 컬럼 이름으로 사용할 수 없음: {field!r}")
+        if field in seen:
+            raise ValueError(f"projection 컬럼 이름 중복: {field!r} (label 로 구분 필요)")
+        seen.add(field)
+
+    args = ", ".join(fields)
+    body = "\n".join(f"    _set(self, {field!r}, {field})" for field in fields) or "    pass"
+    namespace = {"_set": object.__setattr__}
+    exec(f"def __init__(self, {args}):\n{body}\n", namespace)
+
+    name = f"{entity.__name__}Record" if entity is not None else "Record"
+    cls = type(name, (), {
+        "__slots__": fields,
+        "__init__": namespace["__init__"],
+        "__setattr__": _frozen_setattr,
+        "__delattr__": _frozen_setattr,
+        "__repr__": _repr,
+        "__eq__": _eq,
+        "__hash__": _hash,
+        "_astuple": _astuple,
+        "_asdict": _asdict,
+    })
+    _record_classes[cache_key] = cls
+    return cls
+
+
+# select(User) 형태면 mapper 컬럼 조회로 바꿈 (where/order_by 등은 그대로 유지)
+def _column_statement(statement):
+    descriptions = getattr(statement, "column_descriptions", None)
+    if not descriptions or len(descriptions) != 1:
+        return statement, None, None
+
+    entity = descriptions[0]["entity"]
+    if entity is None or descriptions[0]["expr"] is not entity:
+        return statement, None, entity
+
+    props = inspect(entity).column_attrs
+    keys = [prop.key for prop in props]
+    columns = statement.with_only_columns(*[prop.columns[0] for prop in props])
+    return columns, keys, entity
+
+
+# session 또는 connection 으로 실행해서 record 로 변환 (generator)
+def iter_project(executor, statement, params=None, entity=None):
+    statement, keys, found = _column_statement(statement)
+    entity = entity or found
+
+    result = executor.execute(statement, params)
+    cls = record_class(keys or result.keys(), entity)
+    for row in result:
+        yield cls(*row)
+
+
+def project(executor, statement, params=None, entity=None):
+    return list(iter_project(executor, statement, params, entity))
+
+
+# 예제: ORM 조회와 projection 비교
+def main(rows=20000):
+    import gc
+    import time
+
+    from sqlalchemy import create_engine, select, text
+    from sqlalchemy.orm import Session
+
+    from tutorial_models import Base, User
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"name": f"user{i}", "fullname": f"User {i}"} for i in range(rows)
+        ])
+
+    def timeit(label, fn):
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        gc.enable()
+        print(f"{label:<16} {elapsed * 1000:10.2f} ms")
+
+    with Session(engine) as session:
+        timeit("orm entities", lambda: session.scalars(select(User)).all())
+        session.expunge_all()
+        timeit("projection", lambda: project(session, select(User)))
+
+        stmt = text("SELECT id, name FROM user_account WHERE name=:name")
+        stmt = stmt.columns(User.id, User.name)
+        print(project(session, stmt, {"name": "user1"}, entity=User))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# schema ensure - create_all(checkfirst) 대체
+#
+#  create_all / drop_all(checkfirst=True) 는 테이블마다 존재 여부 질의를 보낸다
+#  #  테이블이 많거나, 짧게 실행되는 worker 가 많으면 시작 시간이 테이블 수만큼 늘어남
+#  MetaData 의 DDL 을 fingerprint(sha256) 로 만들어 버전 테이블에 저장해 두고
+#  #  fingerprint 가 같으면: 질의 1번으로 끝 (테이블별 확인 생략)
+#  #  fingerprint 가 다르면: inspector 로 테이블 목록을 한번에 읽어 없는 것만 생성
+#
+#  사용법)
+#  #  Base.metadata.create_all(engine)  대신  ensure_schema(Base.metadata, engine)
+#  #  drop_all 등으로 스키마를 직접 바꾼 경우엔 reset_schema(engine) 로 fingerprint 제거
+
+import hashlib
+import time
+
+from sqlalchemy import Column, MetaData, String, Table, delete, inspect, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+VERSION_TABLE = "schema_version"
+
+# 버전 테이블은 사용자 MetaData 와 분리 (create_all/drop_all 대상이 되지 않도록)
+_version_metadata = MetaData()
+schema_version = Table(
+    VERSION_TABLE,
+    _version_metadata,
+    Column("name", String(100), primary_key=True),
+    Column("fingerprint", String(64), nullable=False),
+)
+
+
+# MetaData 의 DDL 문자열을 dialect 기준으로 컴파일해서 해시
+#  #  dialect 마다 DDL 이 다르므로 같은 MetaData 라도 DB 종류별로 fingerprint 가 다름
+def schema_fingerprint(metadata, dialect):
+    digest = hashlib.sha256()
+    for table in metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda ix: ix.name or ""):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    return digest.hexdigest()
+
+
+# 저장된 fingerprint 조회, 버전 테이블이 없으면 None
+def _stored_fingerprint(engine, name):
+    try:
+        with engine.connect() as conn:
+            return conn.execute(
+                select(schema_version.c.fingerprint).where(
+                    schema_version.c.name == name)).scalar()
+    except DBAPIError:
+        return None
+
+
+# 스키마 보장: 변경이 없으면 질의 1번, 변경이 있으면 없는 테이블/인덱스만 생성
+#  #  반환값: 새로 생성한 테이블 이름 목록 (fast path 는 빈 목록)
+#  #  name 으로 MetaData 를 구분하므로, 여러 Base 를 쓰는 경우 각각 이름을 지정
+#  #  여러 worker 가 동시에 시작하면 같은 테이블을 서로 만들려다 충돌할 수 있음
+#  #  #  already exists / 버전 행 중복 / lock 에러는 잠시 후 테이블 목록을 다시 읽어 재시도
+def ensure_schema(metadata, engine, name="default", retries=5):
+    fingerprint = schema_fingerprint(metadata, engine.dialect)
+    for attempt in range(retries + 1):
+        if _stored_fingerprint(engine, name) == fingerprint:
+            return []
+        try:
+            return _create_missing(metadata, engine, name, fingerprint)
+        except DBAPIError:
+            if attempt == retries:
+                raise
+            time.sleep(0.05 * (attempt + 1))
+
+
+def _create_missing(metadata, engine, name, fingerprint):
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        existing = set(inspector.get_table_names())
+
+        missing = [t for t in metadata.sorted_tables if t.name not in existing]
+        metadata.create_all(conn, tables=missing, checkfirst=False)
+
+        # 기존 테이블에 새로 선언된 인덱스만 추가 (컬럼 변경은 migration 도구 몫)
+        for table in metadata.sorted_tables:
+            if table in missing or not table.indexes:
+                continue
+            index_names = {ix["name"] for ix in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in index_names:
+                    index.create(conn, checkfirst=False)
+
+        if VERSION_TABLE not in existing:
+            schema_version.create(conn, checkfirst=False)
+        conn.execute(delete(schema_version).where(schema_version.c.name == name))
+        conn.execute(schema_version.insert().values(name=name,
+                                                    fingerprint=fingerprint))
+
+    return [t.name for t in missing]
+
+
+# fingerprint 제거: 다음 ensure_schema 가 실제 스키마와 다시 비교하도록 함
+def reset_schema(engine, name="default"):
+    try:
+        with engine.begin() as conn:
+            conn.execute(delete(schema_version).where(schema_version.c.name == name))
+    except DBAPIError:
+        pass
+
+
+# 예제: sqlite 로 fingerprint 동작 확인
+def main():
+    from sqlalchemy import Integer, create_engine
+
+    engine = create_engine("sqlite://", echo=True)
+    metadata = MetaData()
+    Table("users", metadata,
+          Column("id", Integer, primary_key=True),
+          Column("name", String(50), index=True))
+
+    print("created:", ensure_schema(metadata, engine))
+    # 두번째 부터는 schema_version 조회 1번
+    print("created:", ensure_schema(metadata, engine))
+
+    # 모델이 추가되면 없는 테이블만 생성
+    Table("addresses", metadata,
+          Column("id", Integer, primary_key=True),
+          Column("email_address", String(100)))
+    print("created:", ensure_schema(metadata, engine))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# thread / contextvar 단위 session scope
+#
+#  sqlalchemy-2-style.py 의 모듈 전역 session = Session(engine), 1.x 의 공유 session 은
+#  여러 thread 에서 동시에 쓸 수 없다 (Session 은 thread-safe 하지 않음)
+#  scoped_session 으로 scope 마다 session 을 하나씩 두고, session_scope() 로 정리까지 자동화
+#  #  scope="thread": thread 마다 session (기본 scoped_session 동작)
+#  #  scope="context": contextvar 단위 session (asyncio task, 요청 단위 등)
+#
+#  사용법)
+#  #  Session = session_registry(sessionmaker(bind=engine), scope="thread")
+#  #  with session_scope(Session) as session:
+#  #      session.add(User(...))
+#  #  # 정상 종료시 commit, 예외 발생시 rollback, 마지막에 Session.remove()
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from weakref import WeakKeyDictionary
+
+from sqlalchemy.orm import scoped_session
+
+# registry 마다 별도의 scope token (다른 registry 의 session_scope 안에 중첩되어도 서로 독립)
+_scope_tokens = WeakKeyDictionary()
+
+
+def _token_var(registry):
+    var = _scope_tokens.get(registry)
+    if var is None:
+        var = _scope_tokens[registry] = ContextVar("session_scope_token", default=None)
+    return var
+
+
+def session_registry(session_factory, scope="thread"):
+    if scope == "thread":
+        return scoped_session(session_factory)
+    if scope != "context":
+        raise ValueError(f"알 수 없는 scope: {scope!r} (thread, context)")
+
+    var = ContextVar("session_scope_token", default=None)
+
+    def context_scope():
+        token = var.get()
+        if token is None:
+            raise RuntimeError("context scope session 은 session_scope() 안에서만 사용 가능")
+        return token
+
+    registry = scoped_session(session_factory, scopefunc=context_scope)
+    _scope_tokens[registry] = var
+    return registry
+
+
+# 가장 바깥 scope 에서만 commit/rollback/remove 수행 (중첩 호출은 같은 session 사용)
+@contextmanager
+def session_scope(registry):
+    var = _token_var(registry)
+    outer = var.get() is not None
+    token = None if outer else var.set(object())
+    session = registry()
+    try:
+        yield session
+        if not outer:
+            session.commit()
+    except BaseException:
+        if not outer:
+            session.rollback()
+        raise
+    finally:
+        if not outer:
+            registry.remove()
+            var.reset(token)
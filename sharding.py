@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# horizontal sharding - 하나의 모델(User)을 여러 bind(DB)에 나눠 저장
+#
+#  config.py 의 SQLALCHEMY_BINDS 처럼 bind 가 여러개일 때, 모델 단위(__bind_key__)가 아니라
+#  행(row) 단위로 DB 를 나눈다 (sqlalchemy.ext.horizontal_shard.ShardedSession 사용)
+#  #  shard 선택: shard_fn(shard key 값) => shard id, 기본값은 primary key 의 modulo
+#  #  자식 모델(Address)은 부모(User)와 같은 shard 에 저장 (parents 설정)
+#  #  session.get(User, pk): shard key 가 pk 이면 shard 하나만 조회
+#  #  select(): 모든 shard 에 질의, fanout() 은 shard 별로 병렬 실행 후 정렬 병합
+#
+#  주의) shard key 는 flush 전에 값이 있어야 함
+#  #  shard 별 autoincrement 는 pk 가 겹치므로, pk 를 직접 지정하거나 tenant 컬럼 사용
+#  #  parents 의 자식 모델은 pk 를 반드시 직접 지정 (지정하지 않으면 flush 때 ValueError)
+#
+#  사용법)
+#  #  router = ShardRouter({"db1": engine1, "db2": engine2}, parents={Address: "user"})
+#  #  session = router.session()
+#  #  session.add(User(id=1, name="ed", addresses=[Address(...)]))
+#  #  users = router.fanout(select(User), order_by=User.id)
+
+import heapq
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+
+
+# order_by 항목 => (결과 속성 이름, 내림차순 여부)
+#  #  heapq.merge 는 방향을 하나만 지정할 수 있으므로 오름차순/내림차순 혼용과 nulls 지정은 지원하지 않음
+def _merge_key(clause):
+    descending = False
+    if isinstance(clause, UnaryExpression):
+        if clause.modifier not in (operators.asc_op, operators.desc_op):
+            raise ValueError(f"fanout 병합에 사용할 수 없는 order_by: {clause}")
+        descending = clause.modifier is operators.desc_op
+        clause = clause.element
+    key = getattr(clause, "key", None)
+    if not isinstance(key, str):
+        raise ValueError(f"fanout 병합에는 컬럼 order_by 만 사용 가능: {clause}")
+    return key, descending
+
+
+# 기본 shard 함수: 정수는 modulo, 그 밖의 값은 crc32 modulo (프로세스가 달라도 같은 결과)
+def modulo_shard(shard_ids):
+    shard_ids = sorted(shard_ids)
+
+    def shard_fn(value):
+        if not isinstance(value, int):
+            value = zlib.crc32(str(value).encode())
+        return shard_ids[value % len(shard_ids)]
+
+    return shard_fn
+
+
+class ShardRouter:
+
+    # binds: {shard_id: engine}
+    # shard_keys: {Model: "tenant_id"} 처럼 pk 대신 사용할 shard key 컬럼 (기본값은 pk)
+    # parents: {Address: "user"} 자식 모델은 relationship 으로 부모의 shard 를 따라감
+    def __init__(self, binds, shard_fn=None, shard_keys=None, parents=None,
+                 max_workers=None):
+        self.binds = dict(binds)
+        self.shard_fn = shard_fn or modulo_shard(self.binds)
+        self.shard_keys = dict(shard_keys or {})
+        self.parents = dict(parents or {})
+        self.max_workers = max_workers or len(self.binds)
+
+    def session(self, **kw):
+        return ShardedSession(shards=self.binds,
+                              shard_chooser=self.shard_chooser,
+                              identity_chooser=self.identity_chooser,
+                              execute_chooser=self.execute_chooser,
+                              **kw)
+
+    def _shard_key(self, mapper):
+        return self.shard_keys.get(mapper.class_)
+
+    # 객체가 저장될 shard 선택
+    def shard_for(self, instance):
+        mapper = inspect(instance).mapper
+        parent_attr = self.parents.get(mapper.class_)
+        if parent_attr is not None:
+            # session.get() 은 모든 shard 를 조회하므로 자식 pk 는 shard 간에 겹치면 안 됨
+            #  #  shard 별 autoincrement 는 shard 마다 1 부터 시작하므로 pk 를 직접 지정해야 함
+            if None in mapper.primary_key_from_instance(instance):
+                raise ValueError(f"{mapper.class_.__name__} 는 shard 간 고유한 pk 를 직접 지정해야 함 "
+                                 "(shard 별 autoincrement 는 pk 가 겹침)")
+            parent = getattr(instance, parent_attr)
+            if parent is None:
+                raise ValueError(f"{mapper.class_.__name__}.{parent_attr} 가 없어 shard 를 정할 수 없음")
+            state = inspect(parent)
+            if state.key is not None:
+                return state.key[2]
+            return state.identity_token or self.shard_for(parent)
+
+        key = self._shard_key(mapper)
+        if key is not None:
+            value = getattr(instance, key)
+        else:
+            value = mapper.primary_key_from_instance(instance)
+            value = value[0] if len(value) == 1 else tuple(value)
+        if value is None or (isinstance(value, tuple) and None in value):
+            raise ValueError(f"{mapper.class_.__name__} 의 shard key 값이 없음 (flush 전에 지정 필요)")
+        return self.shard_fn(value)
+
+    # ShardedSession hooks
+    def shard_chooser(self, mapper, instance, clause=None):
+        if instance is None:
+            raise ValueError("shard 를 정할 수 없는 문장 - execution_options(shard_id=...) 지정 필요")
+        return self.shard_for(instance)
+
+    # session.get(): pk 가 shard key 이면 해당 shard 만 조회
+    def identity_chooser(self, mapper, primary_key, *, lazy_loaded_from,
+                         execution_options, bind_arguments, **kw):
+        if lazy_loaded_from is not None:
+            return [lazy_loaded_from.identity_token]
+        if mapper.class_ in self.parents or self._shard_key(mapper) is not None:
+            return list(self.binds)
+        value = primary_key[0] if len(primary_key) == 1 else tuple(primary_key)
+        return [self.shard_fn(value)]
+
+    def execute_chooser(self, orm_context):
+        if orm_context.lazy_loaded_from is not None:
+            return [orm_context.lazy_loaded_from.identity_token]
+        return list(self.binds)
+
+    # shard 별 Session 으로 병렬 조회 후 병합
+    #  #  order_by 를 지정하면 각 shard 에서 정렬해서 가져온 뒤 heapq.merge 로 병합 (desc() 가능)
+    #  #  limit 은 shard 마다 적용 후 병합 결과에 한번 더 적용
+    #  #  statement 의 limit()/offset() 은 전체 결과 기준: shard 에는 offset + limit 까지 조회,
+    #  #  병합 후 [offset:offset + limit] 로 자름
+    #  #  반환 객체는 detached 상태 (identity token 에 shard id 가 들어 있음)
+    def fanout(self, statement, order_by=None, limit=None, scalars=True):
+        offset = statement._offset or 0
+        if statement._limit is not None:
+            limit = statement._limit if limit is None else min(limit, statement._limit)
+        statement = statement.limit(None).offset(None)
+
+        order_by = list(order_by) if isinstance(order_by, (list, tuple)) else \
+            [order_by] if order_by is not None else []
+        if order_by:
+            keys = [_merge_key(clause) for clause in order_by]
+            directions = {descending for _, descending in keys}
+            if len(directions) > 1:
+                raise ValueError("fanout 병합은 order_by 방향이 모두 같아야 함")
+            key = attrgetter(*[name for name, _ in keys])
+            descending = directions.pop()
+            statement = statement.order_by(*order_by)
+        if limit is not None:
+            statement = statement.limit(offset + limit)
+
+        def run(shard_id):
+            # identity_token 옵션: ShardedSession 과 같은 identity key 로 로드
+            sharded = statement.execution_options(identity_token=shard_id)
+            with Session(self.binds[shard_id]) as session:
+                result = session.execute(sharded)
+                return result.scalars().all() if scalars else result.all()
+
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            results = list(pool.map(run, self.binds))
+
+        if order_by:
+            merged = heapq.merge(*results, key=key, reverse=descending)
+        else:
+            merged = (row for rows in results for row in rows)
+
+        merged = list(merged)[offset:]
+        return merged[:limit] if limit is not None else merged
+
+
+# 예제: sqlite 파일 3개를 shard 로 사용
+def main():
+    import os
+    import tempfile
+
+    from sqlalchemy import create_engine, select
+
+    from schema_ensure import ensure_schema
+    from tutorial_models import Address, Base, User
+
+    tmpdir = tempfile.mkdtemp()
+    binds = {}
+    for shard_id in ("shard0", "shard1", "shard2"):
+        engine = create_engine(f"sqlite:///{os.path.join(tmpdir, shard_id)}.db")
+        ensure_schema(Base.metadata, engine)
+        binds[shard_id] = engine
+
+    router = ShardRouter(binds, parents={Address: "user"})
+
+    with router.session() as session:
+        for i, name in enumerate(["spongebob", "sandy", "patrick", "squidward", "krabs"], 1):
+            session.add(User(id=i, name=name, fullname=name.title(),
+                             addresses=[Address(id=i, email_address=f"{name}@sqlalchemy.org")]))
+        session.commit()
+
+        # pk 로 shard 하나만 조회
+        sandy = session.get(User, 2)
+        print(sandy, inspect(sandy).identity_token, sandy.addresses)
+        # 자식은 모든 shard 를 조회 (pk 가 shard 간에 고유하므로 한 행만 찾음)
+        print(session.get(Address, 3))
+
+    for user in router.fanout(select(User), order_by=User.id):
+        print(inspect(user).identity_token, user)
+    print([user.id for user in router.fanout(select(User).offset(1).limit(3),
+                                             order_by=User.id.desc())])
+
+
+if __name__ == "__main__":
+    main()
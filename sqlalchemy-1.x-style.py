@@ -34,8 +34,11 @@ class User(Base):
 print(User.__table__)
 
 # 3) 선언한 모든 Table 생성
+#  create_all() 대신 ensure_schema() 사용: DDL fingerprint 가 같으면 테이블별 확인 생략
 
-Base.metadata.create_all(engine)
+from schema_ensure import ensure_schema, reset_schema
+
+ensure_schema(Base.metadata, engine)
 
 # 4) User 데이터 생성
 
@@ -131,6 +134,15 @@ print("scalars() = ScalarResult:", type(results), results)
 last_user = results[-1]
 print(f"last_user[id={last_user.id}]:", User(**last_user))
 
+# 읽기만 할 때는 User(**row) 대신 projection 사용
+#  #  __slots__ 기반 immutable record, session(identity map) 에 등록되지 않음
+from projection import project
+
+stmt = text("SELECT id, name, fullname, nickname FROM users WHERE name=:name_1")
+stmt = stmt.columns(User.id, User.name, User.fullname, User.nickname)
+for user in project(session, stmt, {"name_1": "ed"}, entity=User):
+    print(user.name, user.fullname)
+
 # 8) 변경된 객체의 상태 변화
 
 #  change 이벤트 발생시
@@ -166,9 +178,19 @@ print("pending:", session.new)
 # <User(name='fred', fullname='Fred Flintstone', nickname='freddy')>
 # ])
 
+# flush 가 실행하는 문장(mapper 별 INSERT/UPDATE 수, 배치 여부, 시간) 기록
+from flush_profiler import FlushProfiler
+
+profiler = FlushProfiler().attach(session, engine)
+
 # persistent
 session.commit()  # flush
 
+print(profiler.last.format())
+# flush: new=3 dirty=1 deleted=0 total=...ms db=...ms orm=...ms
+#   1. User   UPDATE statements=1 rows=1 batched=0 single=1 ...
+#   2. User   INSERT statements=3 rows=3 batched=0 single=3 ... (pk fetch x3)
+
 print(f"after commit: ed_user[{ed_user.id}]:", ed_user)
 # after commit: ed_user[13]: <User(name='ed', fullname='Ed Jones', nickname='eddie')>
 
@@ -377,6 +399,20 @@ stmt = text("SELECT name, id, fullname, nickname "
 stmt = stmt.columns(User.name, User.id, User.fullname, User.nickname)
 session.query(User).from_statement(stmt).params(name='ed').all()
 
+# 자주 쓰는 SQL 문장은 시작할 때 한번만 등록해서 재사용 (named query registry)
+#  #  파라미터/컬럼 오타는 등록(prepare) 시점에 에러
+from named_queries import QueryRegistry
+
+queries = QueryRegistry()
+queries.register("user_by_name",
+                 "SELECT name, id, fullname, nickname FROM users where name=:name",
+                 params=["name"],
+                 columns=[User.name, User.id, User.fullname, User.nickname],
+                 entity=User)
+queries.prepare(engine, check=True)
+
+queries.execute(session, "user_by_name", name='ed').all()
+
 #  15) Counting 함수
 #  func.count 외에도 sum, avg, max, min 등 …
 ##############################
@@ -437,7 +473,8 @@ CREATE TABLE email_addresses (
 )
 """
 
-Base.metadata.create_all(engine)
+# EmailAddress 가 추가되어 fingerprint 가 바뀜 => 없는 테이블만 생성
+ensure_schema(Base.metadata, engine)
 
 for k in Base.metadata.tables:
     print(k)
@@ -467,6 +504,8 @@ print(email_table, email_table.columns.keys())
 Base.metadata.drop_all(engine,
                        tables=[user_table, email_table],
                        checkfirst=True)
+# 스키마를 직접 바꿨으므로 fingerprint 제거 (다음 ensure_schema 에서 다시 비교)
+reset_schema(engine)
 
 # DROP TABLE email_addresses
 # DROP TABLE users
@@ -5,36 +5,10 @@
 
 # 1) 모델 선언
 
-from sqlalchemy import Column, ForeignKey, Integer, String
-from sqlalchemy.orm import declarative_base, relationship
+#  모델 선언은 tutorial_models.py 로 분리 (import 시 DB IO 없음)
+#  #  engine 연결, create_all 등은 아래 단계에서 명시적으로 수행
 
-Base = declarative_base()
-
-
-class User(Base):
-    __tablename__ = 'user_account'
-    id = Column(Integer, primary_key=True)
-    name = Column(String(30))
-    fullname = Column(String(50))
-
-    addresses = relationship("Address",
-                             back_populates="user",
-                             cascade="all, delete-orphan")
-
-    def __repr__(self):
-        return f"User(id={self.id!r}, name={self.name!r}, fullname={self.fullname!r}"
-
-
-class Address(Base):
-    __tablename__ = 'address'
-    id = Column(Integer, primary_key=True)
-    email_address = Column(String(100), nullable=False)
-    user_id = Column(Integer, ForeignKey('user_account.id'), nullable=False)
-
-    user = relationship("User", back_populates="addresses")
-
-    def __repr__(self):
-        return f"Address(id={self.id!r}, email_address={self.email_address!r})"
+from tutorial_models import Address, Base, User
 
 
 # 2) DB 연결
@@ -53,8 +27,12 @@ engine = create_engine(db_string, future=True, echo=True)
 # Base 기반으로 선언한 모델들을 DB에 실체화 수행
 # 테이블, 시퀀스 등의 DB 모델 생성
 # 반대로, drop_all() 함수 사용: Base.metadata.drop_all(engine)
+# create_all() 은 실행할 때마다 테이블별 존재 여부를 질의(checkfirst) 하므로
+# ensure_schema() 로 DDL fingerprint 가 같으면 확인 과정을 생략
+
+from schema_ensure import ensure_schema
 
-Base.metadata.create_all(engine)
+ensure_schema(Base.metadata, engine)
 
 # 4) 데이터 개체 생성 및 저장: Session 객체 사용
 
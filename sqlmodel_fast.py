@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# SQLModel table 모델의 빠른 조회(hydration) 경로
+#
+#  session.exec(select(Hero)) 는 행마다 ORM loading + SQLModel(pydantic) 객체 생성 과정을 거친다
+#  #  DB 에서 읽은 값은 이미 검증된 데이터이므로, 대량 조회에서는 불필요한 비용
+#  fast 경로: Core 로 컬럼만 조회하고, 인스턴스를 직접 생성해서 __dict__ 에 값을 채움
+#  #  pydantic validation, 필드 default 처리, identity map 등록을 생략
+#  #  생성된 객체는 detached 상태 (session 에 속하지 않음, 수정하려면 session.merge 사용)
+#
+#  사용법) 쿼리마다 명시적으로 opt-in
+#  #  stmt = fast(select(Hero).where(Hero.age > 30))
+#  #  heroes = exec_models(session, stmt)
+#  #  fast() 를 붙이지 않은 쿼리는 기존처럼 session.exec 로 실행
+
+import gc
+import time
+
+from sqlalchemy import inspect
+from sqlalchemy.orm.attributes import manager_of_class
+from sqlalchemy.orm.state import InstanceState
+
+# execution option 이름 (쿼리별 opt-in 플래그)
+FAST_HYDRATION = "sqlmodel_fast_hydration"
+
+
+def fast(statement):
+    return statement.execution_options(**{FAST_HYDRATION: True})
+
+
+def _entity_of(statement):
+    descriptions = statement.column_descriptions
+    if len(descriptions) != 1 or descriptions[0]["entity"] is None:
+        raise ValueError("fast hydration 은 select(Model) 형태의 단일 엔티티 조회만 지원")
+    return descriptions[0]["entity"]
+
+
+# 행(row)으로부터 인스턴스 직접 생성 - validation/default 처리 없음
+#  #  SQLModel.__new__ 와 같은 pydantic 속성만 초기화하고 InstanceState 를 직접 연결
+#  #  make_transient_to_detached() 대신 identity key 만 지정 (모든 컬럼이 채워져 있으므로 expire 불필요)
+def hydrate(model, rows, keys):
+    mapper = inspect(model)
+    manager = manager_of_class(model)
+    identity_key = mapper.identity_key_from_primary_key
+    pk_index = [keys.index(mapper.get_property_by_column(col).key)
+                for col in mapper.primary_key]
+    fields_set = set(keys)
+
+    new = object.__new__
+    set_attr = object.__setattr__
+    setup_instance = manager.setup_instance
+
+    instances = []
+    for row in rows:
+        instance = new(model)
+        set_attr(instance, "__pydantic_fields_set__", fields_set.copy())
+        set_attr(instance, "__pydantic_extra__", None)
+        set_attr(instance, "__pydantic_private__", None)
+        state = InstanceState(instance, manager)
+        setup_instance(instance, state)
+        instance.__dict__.update(zip(keys, row))
+        state.key = identity_key([row[i] for i in pk_index])
+        instances.append(instance)
+    return instances
+
+
+def exec_models(session, statement):
+    if not statement.get_execution_options().get(FAST_HYDRATION):
+        return list(session.exec(statement))
+
+    model = _entity_of(statement)
+    props = inspect(model).column_attrs
+    keys = [prop.key for prop in props]
+    columns = statement.with_only_columns(*[prop.columns[0] for prop in props])
+    # Core 컬럼 조회: ORM entity loading 을 거치지 않음
+    rows = session.execute(columns).all()
+    return hydrate(model, rows, keys)
+
+
+# 벤치마크: sqlmodel exec / sqlalchemy ORM / Core / fast 경로 비교
+def _timeit(label, fn, repeat=5):
+    best = min(_elapsed(fn) for _ in range(repeat))
+    print(f"{label:<22} {best * 1000:10.2f} ms")
+    return best
+
+
+# 객체 생성량이 많아 gc 실행 시점에 따라 편차가 크므로 측정 중에는 gc 를 멈춤
+def _elapsed(fn):
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def main(rows=20000):
+    from typing import Optional
+
+    from sqlalchemy import create_engine, select as sa_select
+    from sqlalchemy.orm import Session as OrmSession
+    from sqlmodel import Field, Session, SQLModel, select
+
+    class Hero(SQLModel, table=True):
+        id: Optional[int] = Field(default=None, primary_key=True)
+        name: str = Field(index=True)
+        secret_name: str
+        age: Optional[int] = None
+
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Hero.__table__.insert(), [
+            {"name": f"hero{i}", "secret_name": f"secret{i}", "age": i % 90}
+            for i in range(rows)
+        ])
+
+    print(f"{rows} rows")
+    with Session(engine) as session:
+        _timeit("sqlmodel exec", lambda: (
+            session.exec(select(Hero)).all(), session.expunge_all()))
+        _timeit("fast hydration", lambda: exec_models(session, fast(select(Hero))))
+
+    with OrmSession(engine) as session:
+        _timeit("sqlalchemy orm", lambda: (
+            session.scalars(sa_select(Hero)).all(), session.expunge_all()))
+
+    with engine.connect() as conn:
+        _timeit("core rows", lambda: conn.execute(sa_select(Hero.__table__)).all())
+
+
+if __name__ == "__main__":
+    main()
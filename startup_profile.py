@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# startup profiler - import 부터 사용 가능 상태까지의 시간 측정
+#
+#  시작 시간을 단계별로 나눠서 측정
+#  #  framework: sqlalchemy import (profiler 자신도 import 전에는 sqlalchemy 를 import 하지 않음)
+#  #  imports: 모델 모듈 import (sqlmodel/pydantic 등 모듈이 쓰는 나머지 import,
+#  #           import 시점에 IO 가 있으면 여기서 드러남)
+#  #  engine: create_engine (접속은 하지 않음)
+#  #  mappers: configure_mappers() - relationship 등 mapper 설정
+#  #  reflection: DeferredReflection.prepare(engine)
+#  #  ddl: ensure_schema(Base.metadata, engine)
+#
+#  사용법)
+#  #  python startup_profile.py tutorial_models.py sqlite:///tuto.db
+#  #  python startup_profile.py orm-compare.py
+#  #  import 세부 내역은: python -X importtime startup_profile.py ...
+
+import importlib
+import importlib.util
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile:
+
+    def __init__(self):
+        self.phases = {}
+
+    # 단계별 시간 측정 (같은 이름은 누적)
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    @property
+    def total(self):
+        return sum(self.phases.values())
+
+    def report(self):
+        lines = []
+        total = self.total or 1.0
+        for name, elapsed in self.phases.items():
+            lines.append(f"{name:<12} {elapsed * 1000:10.2f} ms {elapsed / total:6.1%}")
+        lines.append(f"{'total':<12} {self.total * 1000:10.2f} ms")
+        return "\n".join(lines)
+
+
+# 모듈 이름 또는 파일 경로로 import
+#  #  sqlalchemy-2-style.py 처럼 '-' 가 들어간 파일은 경로로 import
+def _import(target):
+    if not target.endswith(".py"):
+        return importlib.import_module(target)
+    name = os.path.splitext(os.path.basename(target))[0].replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, target)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# module 의 Base.metadata 를 기본 DDL 대상으로 사용
+def _find_metadata(module):
+    base = getattr(module, "Base", None)
+    return getattr(base, "metadata", None)
+
+
+# engine: Engine 또는 DB url (url 이면 engine 생성 시간도 측정)
+#  #  sqlalchemy 를 이미 import 한 프로세스에서 호출하면 framework 단계는 0 에 가까움
+def profile_startup(target, engine=None, metadata=None, ddl=True):
+    profile = StartupProfile()
+
+    with profile.phase("framework"):
+        from sqlalchemy import create_engine
+        from sqlalchemy.ext.declarative import DeferredReflection
+        from sqlalchemy.orm import configure_mappers
+
+        from schema_ensure import ensure_schema
+
+    with profile.phase("imports"):
+        module = _import(target)
+
+    with profile.phase("mappers"):
+        configure_mappers()
+
+    if engine is None:
+        return profile
+    if isinstance(engine, str):
+        with profile.phase("engine"):
+            engine = create_engine(engine)
+
+    # 아직 prepare 되지 않은 DeferredReflection 클래스 전체
+    with profile.phase("reflection"):
+        DeferredReflection.prepare(engine)
+
+    if metadata is None:
+        metadata = _find_metadata(module)
+    if ddl and metadata is not None:
+        with profile.phase("ddl"):
+            ensure_schema(metadata, engine)
+
+    return profile
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("usage: startup_profile.py <module or file.py> [db url]")
+        return 2
+
+    profile = profile_startup(argv[0], argv[1] if len(argv) > 1 else None)
+    print(profile.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# sqlalchemy 2.0 style 모델 선언 (sqlalchemy-2-style.py 의 User, Address)
+#
+#  모델 모듈에는 선언만 두고, DB 연결(engine)/reflection/DDL 은 하지 않는다
+#  #  import 만으로 DB 접속이 필요하면, CLI 도구나 테스트 worker 의 시작이 느려짐
+#  #  binding 은 사용하는 쪽에서: Session(engine), ensure_schema(Base.metadata, engine)
+
+from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy.orm import declarative_base, relationship
+
+Base = declarative_base()
+
+
+class User(Base):
+    __tablename__ = 'user_account'
+    id = Column(Integer, primary_key=True)
+    name = Column(String(30))
+    fullname = Column(String(50))
+
+    addresses = relationship("Address",
+                             back_populates="user",
+                             cascade="all, delete-orphan")
+
+    def __repr__(self):
+        return f"User(id={self.id!r}, name={self.name!r}, fullname={self.fullname!r}"
+
+
+class Address(Base):
+    __tablename__ = 'address'
+    id = Column(Integer, primary_key=True)
+    email_address = Column(String(100), nullable=False)
+    user_id = Column(Integer, ForeignKey('user_account.id'), nullable=False)
+
+    user = relationship("User", back_populates="addresses")
+
+    def __repr__(self):
+        return f"Address(id={self.id!r}, email_address={self.email_address!r})"
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# bulk upsert - 있으면 UPDATE, 없으면 INSERT 를 한 문장으로
+#
+#  1.x 스크립트처럼 filter_by(name='ed').first() 로 확인한 뒤 INSERT 하면
+#  #  행마다 round trip 이 생기고, 확인과 INSERT 사이에 다른 요청이 끼어들면 중복이 생김
+#  bulk_upsert(): conflict(UNIQUE/PK 컬럼) 기준으로 dialect 별 upsert 문장을 batch_size 단위로 실행
+#  #  sqlite, postgresql: INSERT ... ON CONFLICT (conflict) DO UPDATE SET col = excluded.col
+#  #  mysql, mariadb:     INSERT ... ON DUPLICATE KEY UPDATE col = VALUES(col)
+#  #  #  MySQL 은 conflict 를 지정할 수 없음 (테이블의 모든 UNIQUE/PK 에 대해 동작)
+#  #  rows: dict 또는 매핑 객체 (객체는 로드/설정된 컬럼 속성만 사용)
+#  #  update: 충돌시 갱신할 컬럼 (기본: pk, conflict 를 제외한 입력 컬럼 전체)
+#  #  #  입력에 같은 conflict 값이 여러번 있으면 마지막 행만 사용
+#  #  #  conflict 값에 NULL 이 있는 행은 충돌하지 않으므로 중복 제거 없이 모두 INSERT
+#  #  returning=True: rows 순서대로 pk tuple 목록 반환
+#  #  #  RETURNING 을 지원하지 않는 dialect(MySQL)는 conflict 값으로 다시 SELECT
+#  #  session 에 이미 로드된 객체는 갱신되지 않음 (populate_existing 또는 expire 필요)
+#
+#  사용법)
+#  #  bulk_upsert(session, User, [{"name": "ed", "fullname": "Ed Jones"}, ...], conflict=["name"])
+#  #  pks = bulk_upsert(conn, User, users, conflict=["name"], update=["fullname"], returning=True)
+
+from sqlalchemy import inspect, select, tuple_
+from sqlalchemy.orm import Session
+
+# conflict 값에 NULL 이 있는 행의 key (행마다 따로 보관)
+_NULL = object()
+
+
+def _insert_for(dialect):
+    if dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect.name in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+    else:
+        raise ValueError(f"upsert 를 지원하지 않는 dialect: {dialect.name}")
+    return insert
+
+
+def _dialect(executor, entity, table):
+    if isinstance(executor, Session):
+        if table is entity:
+            return executor.get_bind(clause=table).dialect
+        return executor.get_bind(entity).dialect
+    return executor.dialect
+
+
+# 입력 행 => {컬럼 key: 값}
+def _row_values(row, mapper, attr_columns):
+    if isinstance(row, dict):
+        return {attr_columns.get(key, key): value for key, value in row.items()}
+    state = inspect(row)
+    if mapper is None or state.mapper is not mapper:
+        raise TypeError(f"{type(row).__name__} 객체는 upsert 대상 매핑 객체가 아님")
+    values = {}
+    for prop in mapper.column_attrs:
+        if prop.key not in state.dict:
+            continue
+        value = state.dict[prop.key]
+        column = prop.columns[0]
+        if value is None and column.primary_key:
+            continue
+        values[column.key] = value
+    return values
+
+
+def _upsert_statement(insert, table, conflict, update, pk, returning):
+    stmt = insert(table)
+    # 갱신할 컬럼이 없어도 DO UPDATE 로 만들어야 기존 행도 RETURNING 됨 (conflict 컬럼을 그대로 SET)
+    names = update or conflict[:1]
+    if hasattr(stmt, "on_conflict_do_update"):
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[name] for name in conflict],
+            set_={name: stmt.excluded[name] for name in names})
+        if returning:
+            # 반환 행은 conflict 값으로 입력과 짝을 맞추므로 순서 보장(sort_by_parameter_order) 불필요
+            #  #  순서 보장을 요구하면 insertmanyvalues 가 행마다 한 문장씩 실행함
+            stmt = stmt.returning(*pk, *(table.c[name] for name in conflict))
+    else:
+        stmt = stmt.on_duplicate_key_update({name: stmt.inserted[name] for name in names})
+    return stmt
+
+
+# conflict 값 => pk (RETURNING 을 쓸 수 없을 때)
+def _select_pks(executor, table, conflict, pk, keys):
+    columns = [table.c[name] for name in conflict]
+    target = columns[0] if len(columns) == 1 else tuple_(*columns)
+    values = [key[0] for key in keys] if len(columns) == 1 else keys
+    rows = executor.execute(select(*pk, *columns).where(target.in_(values)))
+    return {tuple(row[len(pk):]): tuple(row[:len(pk)]) for row in rows}
+
+
+def bulk_upsert(executor, entity, rows, conflict, update=None, batch_size=500, returning=False):
+    mapper = inspect(entity, raiseerr=False)
+    mapper = mapper if mapper is not None and getattr(mapper, "is_mapper", False) else None
+    table = mapper.local_table if mapper is not None else entity
+    attr_columns = {prop.key: prop.columns[0].key for prop in mapper.column_attrs} \
+        if mapper is not None else {}
+    conflict = [attr_columns.get(name, name) for name in conflict]
+    if update is not None:
+        update = [attr_columns.get(name, name) for name in update]
+    pk = list(table.primary_key.columns)
+
+    dialect = _dialect(executor, entity, table)
+    insert = _insert_for(dialect)
+    use_returning = returning and dialect.name not in ("mysql", "mariadb")
+
+    # conflict 값 기준으로 중복 제거 (마지막 행 사용), 입력 순서의 key 목록 보관
+    unique = {}
+    order = []
+    for row in rows:
+        values = _row_values(row, mapper, attr_columns)
+        try:
+            key = tuple(values[name] for name in conflict)
+        except KeyError as error:
+            raise ValueError(f"conflict 컬럼 값이 없는 행: {values}") from error
+        if any(value is None for value in key):
+            key = (_NULL, len(order))
+        order.append(key)
+        unique.pop(key, None)
+        unique[key] = values
+
+    # 컬럼 구성이 같은 행끼리 묶어서 executemany
+    groups = {}
+    for key, values in unique.items():
+        groups.setdefault(frozenset(values), []).append((key, values))
+
+    pks = {}
+    for columns, items in groups.items():
+        names = [name for name in (update if update is not None else columns)
+                 if name not in conflict and table.c[name] not in pk]
+        missing = set(names) - columns
+        if missing:
+            raise ValueError(f"update 컬럼 값이 없는 행: {sorted(missing)}")
+        stmt = _upsert_statement(insert, table, conflict, sorted(names), pk, use_returning)
+
+        # NULL 은 UNIQUE 충돌이 없어 항상 INSERT 되고, 반환 행을 conflict 값으로 짝지을 수 없음
+        #  #  returning 이면 행마다 실행해서 inserted_primary_key 사용
+        loose = [item for item in items if item[0][0] is _NULL]
+        items = [item for item in items if item[0][0] is not _NULL]
+        if loose and returning:
+            plain = _upsert_statement(insert, table, conflict, sorted(names), pk, False)
+            for key, values in loose:
+                pks[key] = tuple(executor.execute(plain, values).inserted_primary_key)
+        elif loose:
+            items += loose
+
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            result = executor.execute(stmt, [values for _, values in batch])
+            if use_returning:
+                for row in result:
+                    pks[tuple(row[len(pk):])] = tuple(row[:len(pk)])
+            elif returning:
+                pks.update(_select_pks(executor, table, conflict, pk,
+                                       [key for key, _ in batch]))
+
+    if returning:
+        return [pks.get(key) for key in order]
+    return len(unique)
+
+
+# 예제: name 이 UNIQUE 인 user_account 에 같은 사용자 목록을 두번 upsert
+def main():
+    from sqlalchemy import Index, create_engine, func
+    from sqlalchemy.dialects import mysql, postgresql
+
+    from tutorial_models import Base, User
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Index("ux_user_account_name", User.name, unique=True).create(engine)
+
+    users = [{"name": "ed", "fullname": "Ed Jones"},
+             {"name": "wendy", "fullname": "Wendy Williams"},
+             {"name": "mary", "fullname": "Mary Contrary"}]
+    with Session(engine) as session:
+        print(bulk_upsert(session, User, users, conflict=["name"], returning=True))
+        session.commit()
+
+        users[0]["fullname"] = "Eddie Jones"
+        users.append(User(name="fred", fullname="Fred Flintstone"))
+        print(bulk_upsert(session, User, users, conflict=["name"], returning=True))
+        session.commit()
+        print(session.scalar(select(func.count()).select_from(User)),
+              session.scalars(select(User).order_by(User.id)).all())
+
+    # dialect 별 문장
+    table = User.__table__
+    for dialect in (postgresql.dialect(), mysql.dialect()):
+        stmt = _upsert_statement(_insert_for(dialect), table, ["name"], ["fullname"],
+                                 list(table.primary_key), False)
+        print(stmt.compile(dialect=dialect))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# write-behind flush - 작은 변경들을 모아서 한번에 commit
+#
+#  patrick.addresses.append(Address(...)), ed_user.nickname = 'eddie' 처럼 객체 하나씩 바꾸고
+#  요청마다 commit 하면, 변경마다 fsync 와 round trip 이 한번씩 발생
+#  write-behind 모드: session 의 대기 중인 변경(new/dirty/deleted)을 background flusher 에 넘김
+#  #  flusher 는 max_batch 개 또는 max_delay 초 단위로 모아서 하나의 transaction 으로 commit
+#  #  같은 identity(같은 행)에 대한 변경은 flusher session 의 한 객체에 차례로 적용
+#  #  submit() 은 Future 를 반환: commit 되면 result(), 실패하면 exception()
+#  #  #  제출마다 SAVEPOINT 로 나눠 flush: 한 제출의 에러는 그 제출의 future 에만 전달
+#
+#  주의)
+#  #  submit() 전에 flush 하지 않아야 함 (flush 된 변경은 호출한 session 의 transaction 에 남음)
+#  #  lazy load 등에서 autoflush 가 일어나지 않도록 autoflush=False session 만 허용 (flusher.session())
+#  #  submit() 한 객체는 호출한 session 에서 분리되어 flusher 소유가 됨 (이후 수정 금지)
+#
+#  사용법)
+#  #  flusher = WriteBehindFlusher(sessionmaker(bind=engine))
+#  #  session = flusher.session()
+#  #  ed_user = session.get(User, 1)
+#  #  ed_user.nickname = 'eddie'
+#  #  future = flusher.submit(session)
+#  #  future.result()  # 필요한 경우에만 commit 완료 대기
+#  #  flusher.close()
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import attributes
+
+_STOP = object()
+
+
+class WriteBehindFlusher:
+
+    def __init__(self, session_factory, max_batch=500, max_delay=0.05):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.commits = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    # 변경을 만들 session (autoflush 꺼짐)
+    def session(self, **kw):
+        return self.session_factory(autoflush=False, **kw)
+
+    # session 의 변경을 꺼내서 flusher 로 넘김
+    #  #  callback(future): commit 완료(또는 실패) 후 flusher thread 에서 호출
+    def submit(self, session, callback=None):
+        if self._closed:
+            raise RuntimeError("WriteBehindFlusher 가 이미 종료됨")
+        if session.autoflush:
+            raise ValueError("write-behind 에는 autoflush=False session 필요 (flusher.session() 사용)")
+
+        changes = [("save", obj) for obj in session.new]
+        changes += [("save", obj) for obj in session.dirty if session.is_modified(obj)]
+        changes += [("delete", obj) for obj in session.deleted]
+        for _, obj in changes:
+            if obj in session:
+                session.expunge(obj)
+
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        if not changes:
+            future.set_result(0)
+            return future
+
+        self._queue.put((changes, future))
+        return future
+
+    def close(self, timeout=None):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # 배치 수집: 첫 항목 이후 max_delay 동안, 또는 변경 수가 max_batch 가 될 때까지
+    def _collect(self, first):
+        items = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_delay
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            items.append(item)
+            size += len(item[0])
+        return items
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            self._flush(self._collect(first))
+
+        # 종료 전에 남은 항목 처리
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        if leftover:
+            self._flush(leftover)
+
+    # 제출마다 SAVEPOINT 안에서 flush, 전체는 하나의 transaction 으로 commit
+    #  #  한 제출이 실패(IntegrityError 등)하면 그 SAVEPOINT 만 rollback 하고 해당 future 에만 예외 전달
+    #  #  (transaction 전체를 rollback 하면 다른 제출의 변경이 expire 되어 다시 적용할 수 없음)
+    def _flush(self, items):
+        session = self.session_factory()
+        applied = []
+        try:
+            for changes, future in items:
+                savepoint = session.begin_nested()
+                try:
+                    self._apply(session, changes)
+                    session.flush()
+                except Exception as error:
+                    savepoint.rollback()
+                    future.set_exception(error)
+                else:
+                    savepoint.commit()
+                    applied.append((changes, future))
+            if applied:
+                session.commit()
+        except Exception as error:
+            session.rollback()
+            for _, future in applied:
+                future.set_exception(error)
+        else:
+            if applied:
+                self.commits += 1
+            for changes, future in applied:
+                future.set_result(len(changes))
+        finally:
+            session.close()
+            self.batches += 1
+
+    # 제출 하나(같은 session 에서 나온 변경)를 flusher session 에 반영
+    #  #  같은 identity 가 앞선 제출로 이미 session 에 있으면(dup) 변경된 속성만 기존 객체에 적용 (coalesce)
+    #  #  add() cascade 중 identity 충돌이 나지 않도록, dup 를 가리키는 참조를 먼저 기존 객체로 바꿈
+    def _apply(self, session, changes):
+        reachable = _reachable(session, [obj for _, obj in changes])
+        canonical = {}
+        for obj in reachable:
+            key = inspect(obj).key
+            if key is not None and key in session.identity_map:
+                canonical[obj] = session.identity_map[key]
+
+        def resolve(value):
+            return canonical.get(value, value) if value is not None else None
+
+        for obj in reachable:
+            if obj not in canonical:
+                _rewire(obj, resolve)
+        for dup, target in canonical.items():
+            _coalesce(dup, target, resolve)
+
+        for op, obj in changes:
+            target = resolve(obj)
+            if target not in session:
+                session.add(target)
+            if op == "delete":
+                session.delete(target)
+
+
+# 로드된 relationship 을 따라 도달 가능한 객체 (flusher session 에 이미 있는 객체는 제외)
+def _reachable(session, roots):
+    seen = {}
+    stack = list(roots)
+    while stack:
+        obj = stack.pop()
+        if obj in seen or obj in session:
+            continue
+        seen[obj] = None
+        state = inspect(obj)
+        for prop in state.mapper.relationships:
+            value = state.dict.get(prop.key)
+            if value is None:
+                continue
+            stack.extend(value if prop.uselist else [value])
+    return list(seen)
+
+
+def _rewire(obj, resolve):
+    state = inspect(obj)
+    for prop in state.mapper.relationships:
+        value = state.dict.get(prop.key)
+        if value is None:
+            continue
+        if not prop.uselist:
+            if resolve(value) is not value:
+                setattr(obj, prop.key, resolve(value))
+            continue
+        for item in list(value):
+            target = resolve(item)
+            if target is not item:
+                value.remove(item)
+                if target not in value:
+                    value.append(target)
+
+
+def _coalesce(dup, target, resolve):
+    mapper = inspect(dup).mapper
+    for key in mapper.column_attrs.keys():
+        history = attributes.get_history(dup, key, attributes.PASSIVE_NO_INITIALIZE)
+        if history.added:
+            setattr(target, key, history.added[0])
+
+    for prop in mapper.relationships:
+        history = attributes.get_history(dup, prop.key, attributes.PASSIVE_NO_INITIALIZE)
+        if not history.has_changes():
+            continue
+        if not prop.uselist:
+            setattr(target, prop.key, resolve(history.added[0]) if history.added else None)
+            continue
+        collection = getattr(target, prop.key)
+        for item in history.added:
+            if resolve(item) not in collection:
+                collection.append(resolve(item))
+        for item in history.deleted:
+            if resolve(item) in collection:
+                collection.remove(resolve(item))
+
+
+# 예제: 여러 thread 에서 작은 변경을 submit
+def main(writers=8, changes=200):
+    import os
+    import tempfile
+
+    from sqlalchemy import create_engine, event, func, select
+    from sqlalchemy.orm import Session, sessionmaker
+
+    from schema_ensure import ensure_schema
+    from tutorial_models import Address, Base, User
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'wb.db')}")
+    ensure_schema(Base.metadata, engine)
+
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+
+    with Session(engine) as session:
+        session.add_all([User(id=i, name=f"user{i}", fullname="") for i in range(writers)])
+        session.commit()
+    commits.clear()
+
+    flusher = WriteBehindFlusher(sessionmaker(bind=engine), max_batch=200, max_delay=0.02)
+
+    def writer(i):
+        futures = []
+        for n in range(changes):
+            with flusher.session() as session:
+                user = session.get(User, i)
+                user.fullname = f"User {i} #{n}"
+                user.addresses.append(Address(email_address=f"user{i}-{n}@sqlalchemy.org"))
+                futures.append(flusher.submit(session))
+        for future in futures:
+            future.result()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    flusher.close()
+    elapsed = time.perf_counter() - start
+
+    with Session(engine) as session:
+        addresses = session.scalar(select(func.count()).select_from(Address))
+        print(session.get(User, 0))
+    print(f"{writers * changes} submits, {addresses} addresses, "
+          f"{len(commits)} commits, {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()